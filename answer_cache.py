@@ -0,0 +1,192 @@
+from PIL import Image
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import json
+import logging
+import os
+import threading
+import time
+from config import get_config_dir
+
+CACHE_VERSION = 2
+
+
+def dhash(img: Image.Image, hash_size: int = 16) -> int:
+    """
+    Computes a difference hash of the image: each bit records whether a pixel
+    of a (hash_size + 1) x hash_size grayscale thumbnail is brighter than its
+    right-hand neighbour.
+
+    Args:
+        img (PIL.Image.Image): The input image.
+        hash_size (int): Hash grid size; the hash has hash_size ** 2 bits.
+
+    Returns:
+        int: The hash as an unsigned integer.
+    """
+    small = img.convert("L").resize((hash_size + 1, hash_size), Image.BOX)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+class AnswerCache:
+    """
+    LRU cache of validated answers keyed by perceptual hash, persisted as JSON.
+
+    A lookup matches the closest stored hash within `max_distance` bits, so a
+    re-capture of the same question with a moved cursor or a blinking caret
+    still hits. Entries are also keyed by a variant string naming the model
+    and prompt settings, and only match a lookup with the same variant.
+    Changes are written to disk on a background thread, so a store does not
+    hold up the press that made it. Safe to use from several threads.
+    """
+
+    def __init__(self, path, max_entries: int = 500, ttl_s: float = 7 * 24 * 3600, max_distance: int = 2):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.max_distance = max_distance
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._saver = ThreadPoolExecutor(max_workers=1, thread_name_prefix='answer-cache')
+        self._save_pending = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logging.warning("Ignoring unreadable answer cache %s: %s", self.path, e)
+            return
+        if data.get('version') != CACHE_VERSION:
+            return
+        for entry in data.get('entries', []):
+            self._entries[(entry['variant'], int(entry['hash'], 16))] = entry
+        self._expire(time.time())
+
+    def _schedule_save(self):
+        # Called with the lock held; stores made before the write starts share it
+        if not self._save_pending:
+            self._save_pending = True
+            self._saver.submit(self._save)
+
+    def _save(self):
+        with self._lock:
+            self._save_pending = False
+            data = {
+                'version': CACHE_VERSION,
+                'entries': [dict(entry) for entry in self._entries.values()],
+            }
+        tmp_path = f"{self.path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.warning("Failed to save answer cache: %s", e)
+
+    def _expire(self, now: float):
+        if self.ttl_s > 0:
+            for key in [k for k, e in self._entries.items() if now - e['created'] > self.ttl_s]:
+                del self._entries[key]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key: int, variant: str = '') -> dict | None:
+        """
+        Looks up the closest cached answer within the Hamming tolerance.
+
+        Args:
+            key (int): Perceptual hash of the question image.
+            variant (str): Model and prompt settings the answer must match.
+
+        Returns:
+            dict | None: A copy of the cached result marked with 'cached': True,
+                         or None on a miss.
+        """
+        with self._lock:
+            self._expire(time.time())
+            best_key, best_distance = None, self.max_distance + 1
+            for candidate in self._entries:
+                if candidate[0] != variant:
+                    continue
+                distance = (candidate[1] ^ key).bit_count()
+                if distance < best_distance:
+                    best_key, best_distance = candidate, distance
+                    if distance == 0:
+                        break
+            if best_key is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(best_key)
+            entry = self._entries[best_key]
+            entry['last_used'] = time.time()
+            logging.info("Answer cache hit at Hamming distance %d", best_distance)
+            result = dict(entry['result'])
+        result['cached'] = True
+        return result
+
+    def put(self, key: int, result: dict, variant: str = '') -> None:
+        """
+        Stores a validated result and schedules a write of the cache.
+
+        Args:
+            key (int): Perceptual hash of the question image.
+            result (dict): Result that passed validate_result().
+            variant (str): Model and prompt settings that produced it.
+        """
+        now = time.time()
+        stored = {k: v for k, v in result.items() if k != 'cached'}
+        with self._lock:
+            self._entries[(variant, key)] = {'hash': f"{key:x}", 'variant': variant, 'result': stored,
+                                             'created': now, 'last_used': now}
+            self._entries.move_to_end((variant, key))
+            self._expire(now)
+            self._schedule_save()
+
+    def clear(self) -> None:
+        """Removes every cached answer."""
+        with self._lock:
+            self._entries.clear()
+            self._schedule_save()
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache(config: dict) -> AnswerCache:
+    """
+    Returns the process-wide answer cache, applying the current limits from
+    the config.
+
+    Args:
+        config (dict): Application config.
+
+    Returns:
+        AnswerCache: The shared cache stored under get_config_dir().
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AnswerCache(str(get_config_dir() / "answer_cache.json"))
+        _cache.max_entries = config.get('cache_max_entries', 500)
+        _cache.ttl_s = config.get('cache_ttl_s', 7 * 24 * 3600)
+        _cache.max_distance = config.get('cache_max_distance', 2)
+        return _cache
@@ -3,114 +3,242 @@ from PySide6.QtCore import Qt, QThread, Signal
 import sys
 import time
 import logging
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from ui_main import MainWindow
-from config import load_config
-from hotkey import register, unregister
-from capture import detect_monitor_under_mouse, capture_monitor, crop_percent, downscale_max_width, encode_png_base64
-from router import call_openrouter, validate_result
+from config import load_config, setup_logging
+from hotkey import register, unregister, register_keydown, unregister_keydown
+from capture import get_capture_session
+from router import route_request, Deadline, CancelToken
+from pipeline import capture_question, prepare_payload, answer_payload
+from precapture import FrameRing
+from watch import Watcher
 from overlay import show_notification
+import metrics
+
+NETWORK_WORKERS = 4
 
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
-print("Logging configured")
 
 class Worker(QThread):
+    """
+    Long-lived pipeline worker fed by a queue of hotkey presses.
+
+    In 'latest' press mode a new press cancels the one in flight (its HTTP
+    request is aborted and its result discarded) and drops any still queued;
+    in 'queue' mode presses are answered in order.
+    """
     finished = Signal(dict, float)
+    partial = Signal(dict)
     error = Signal(str)
+    stats = Signal(dict)
 
     def __init__(self, config):
         super().__init__()
         self.config = config
+        self._jobs = queue.Queue()
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._current = None
+        # Requests run on their own threads so a superseded press never
+        # blocks the next one while it waits for response headers
+        self._network = ThreadPoolExecutor(max_workers=NETWORK_WORKERS, thread_name_prefix='press-request')
+        # Requests on the pool that have not returned, superseded ones included
+        self._network_pending = set()
+        self._network_lock = threading.Lock()
+        self.precapture = FrameRing()
+        self.watcher = Watcher(self.submit)
+
+    def submit(self) -> int:
+        """Queues a press with a snapshot of the current config; returns its id."""
+        token = CancelToken()
+        with self._lock:
+            self._next_id += 1
+            job_id = self._next_id
+            if self.config.get('press_mode', 'latest') == 'latest':
+                while True:
+                    try:
+                        stale = self._jobs.get_nowait()
+                    except queue.Empty:
+                        break
+                    if stale is not None:
+                        stale[1].cancel()
+                        logging.debug("Dropped queued press %s", stale[0])
+                if self._current is not None:
+                    logging.info("Press %s supersedes press %s", job_id, self._current[0])
+                    self._current[1].cancel()
+            self._jobs.put((job_id, token, dict(self.config), time.time()))
+        return job_id
+
+    def stop(self) -> None:
+        """Cancels the press in flight and ends the worker loop."""
+        with self._lock:
+            if self._current is not None:
+                self._current[1].cancel()
+        self._jobs.put(None)
+        self._network.shutdown(wait=False, cancel_futures=True)
 
     def run(self):
-        print("Worker thread started")
         logging.info("Worker thread started")
-        start_time = time.time()
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            with self._lock:
+                self._current = job
+            try:
+                if not job[1].cancelled:
+                    self._process(job)
+            finally:
+                with self._lock:
+                    self._current = None
+        get_capture_session().release()
+        logging.info("Worker thread stopped")
+
+    def _route(self, data_url, config, deadline, on_partial, token, question_text=None):
+        def guarded_partial(fields):
+            if not token.cancelled:
+                on_partial(fields)
+
+        future = self._start_request(metrics.bind(route_request), data_url, config, deadline,
+                                     guarded_partial if on_partial is not None else None, token, question_text)
+        while not future.done():
+            if token.wait(0.05):
+                # Leave the request to unwind on its own thread
+                return {'error': 'cancelled'}
+        return future.result()
+
+    def _start_request(self, fn, *args) -> Future:
+        """
+        Runs a request on the pool, or on a thread of its own when every pool
+        thread is still held by a superseded request waiting for headers
+        (cancelling cannot abort those), so the newest press never queues
+        behind them.
+        """
+        with self._network_lock:
+            busy = len(self._network_pending) >= NETWORK_WORKERS
+        if not busy:
+            future = self._network.submit(fn, *args)
+            with self._network_lock:
+                self._network_pending.add(future)
+            future.add_done_callback(self._forget_request)
+            return future
+        logging.info("All request threads are busy, starting another for this press")
+        future = Future()
+
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, name='press-request-extra', daemon=True).start()
+        return future
+
+    def _forget_request(self, future):
+        with self._network_lock:
+            self._network_pending.discard(future)
+
+    def _finish(self, token, result, inference_time):
+        trace = metrics.current_trace()
+        if trace is not None:
+            trace.set('outcome', 'cached' if result.get('cached') else 'ok')
+            trace.set('model_used', result.get('model_used'))
+        if not token.cancelled:
+            self.finished.emit(result, inference_time)
+
+    def _fail(self, token, msg):
+        trace = metrics.current_trace()
+        if trace is not None:
+            trace.set('outcome', msg)
+        if not token.cancelled:
+            self.error.emit(msg)
+
+    def _process(self, job):
+        trace = metrics.Trace(job[0])
+        trace.set('outcome', 'cancelled')
+        with metrics.tracing(trace):
+            try:
+                self._run_stages(job, trace)
+            finally:
+                metrics.record_trace(trace)
+                # Summarised here so the GUI thread only formats text
+                summary = metrics.get_latency_stats().summary()
+                if precapture_mode(self.config) != 'off':
+                    summary['precapture'] = self.precapture.stats()
+                if self.config.get('watch_enabled', False):
+                    summary['watch'] = self.watcher.stats()
+                self.stats.emit(summary)
+
+    def _run_stages(self, job, trace):
+        job_id, token, config, start_time = job
+        trace.set('queued_ms', (time.time() - start_time) * 1000)
+        logging.info("Processing press %s", job_id)
+        deadline = Deadline(config.get('request_deadline_s', 20.0) - (time.time() - start_time))
         try:
-            print("Detecting monitor")
-            mon = detect_monitor_under_mouse()
-            print("Capturing monitor")
-            img = capture_monitor(mon)
-            print("Cropping image")
-            img = crop_percent(img, self.config['top_crop_pct'], self.config['bottom_crop_pct'])
-            print("Downscaling image")
-            img = downscale_max_width(img, self.config['max_width'])
-            print("Encoding image")
-            data_url = encode_png_base64(img)
-            print("Calling OpenRouter API")
-            result = call_openrouter(data_url, self.config['model'], self.config['api_key'], self.config.get('enable_reasoning', False), 30.0)
-            print("API call completed")
-            if result is None or (isinstance(result, dict) and 'error' in result):
-                if isinstance(result, dict):
-                    if result['error'] == 'auth':
-                        print("API auth error")
-                        logging.error("API authentication error")
-                        self.error.emit('auth')
-                        return
-                    elif result['error'] in ['server', 'timeout', 'network']:
-                        print("No response from API")
-                        logging.error("No response from API")
-                        self.error.emit('no_response')
-                        return
-                    elif result['error'] == 'parse':
-                        print("Parse error")
-                        logging.error("Parse error in API response")
-                        self.error.emit('parse_error')
-                        return
-                else:
-                    print("No response")
-                    logging.error("No response from API")
-                    self.error.emit('no_response')
-                    return
-            print("Validating result")
-            valid, msg = validate_result(result)
-            if not valid:
-                print("Validation failed")
-                logging.error("Validation failed for API result")
-                self.error.emit('parse_error')
+            payload = None
+            if precapture_mode(config) != 'off':
+                payload = self.precapture.take(config)
+                trace.set('precaptured', payload is not None)
+            if payload is None:
+                payload = prepare_payload(capture_question(config), config, encode=False)
+            result, error = answer_payload(payload, config, deadline, self.partial.emit, token, route=self._route)
+            if error == 'cancelled':
+                logging.info("Press %s superseded", job_id)
+                return
+            if error is not None:
+                self._fail(token, error)
                 return
             inference_time = (time.time() - start_time) * 1000
-            print(f"Worker completed in {inference_time:.0f} ms")
-            logging.info(f"Worker completed successfully in {inference_time:.0f} ms")
-            self.finished.emit(result, inference_time)
+            if result.get('cached'):
+                logging.info("Answer served from cache in %.0f ms", inference_time)
+            else:
+                logging.info("Worker completed successfully in %.0f ms", inference_time)
+            self._finish(token, result, inference_time)
         except Exception as e:
-            print(f"Exception in worker: {e}")
-            logging.error(f"Exception in worker thread: {e}")
-            self.error.emit('error')
+            logging.exception("Exception in worker thread: %s", e)
+            self._fail(token, 'error')
+
+def precapture_mode(config):
+    return config.get('precapture_mode', 'off')
+
+def start_hotkeys(window, combo):
+    register(combo, lambda: hotkey_callback(window))
+    worker = window.pipeline_worker
+    worker.precapture.configure(window.config)
+    mode = precapture_mode(window.config)
+    if mode == 'keydown':
+        register_keydown(combo, lambda: worker.precapture.capture_async(window.config))
+    elif mode == 'ring':
+        worker.precapture.start(window.config)
+    if window.config.get('watch_enabled', False):
+        worker.watcher.start(window.config)
+
+def stop_hotkeys(window):
+    combo = window.hotkey_input.text()
+    unregister(combo)
+    unregister_keydown(combo)
+    window.pipeline_worker.precapture.stop()
+    window.pipeline_worker.watcher.stop()
 
 def hotkey_callback(window):
-    print("Hotkey callback entered")
-    print("Hotkey triggered, starting worker thread")
-    logging.info("Hotkey triggered, starting worker thread")
-    if hasattr(window, 'current_worker') and window.current_worker and window.current_worker.isRunning():
-        print("Previous worker still running, skipping new worker")
-        logging.warning("Previous worker still running, skipping new worker")
-        print("Hotkey callback exited early")
-        return
+    logging.info("Hotkey triggered, submitting press")
     try:
-        worker = Worker(window.config)
-        window.current_worker = worker
-        worker.finished.connect(window.answerReady)
-        worker.error.connect(lambda msg: on_error(window, msg))
-        worker.start()
-        print("Worker thread started")
-        logging.debug("Worker thread started")
+        job_id = window.pipeline_worker.submit()
+        logging.debug("Press %s submitted", job_id)
     except Exception as e:
-        print(f"Exception in hotkey_callback: {e}")
-        logging.error(f"Exception in hotkey_callback: {e}")
-        window.current_worker = None
-    print("Hotkey callback exited")
+        logging.error("Exception in hotkey_callback: %s", e)
 
 def on_finished(window, result, inference_time):
     logging.info("Worker finished successfully")
-    print("on_finished called")
-    window.current_worker = None
     logging.info("Worker completed, app continues running")
     confidence = result['confidence']
     threshold = window.config['confidence_threshold']
     bypass = window.config.get('bypass_confidence', False)
-    print(f"Confidence: {confidence}, Threshold: {threshold}, Bypass: {bypass}")
+    logging.debug("Confidence: %s, Threshold: %s, Bypass: %s", confidence, threshold, bypass)
     if bypass or confidence >= threshold:
-        print("Showing dialog")
         # Show answer dialog
         dialog = QDialog(window)
         dialog.setWindowFlags(Qt.Window | Qt.WindowStaysOnTopHint)
@@ -146,14 +274,11 @@ def on_finished(window, result, inference_time):
         dialog.show()
         dialog.raise_()
         QApplication.processEvents()
-        print("Dialog shown")
-    else:
-        print("Not showing dialog")
     window.status_bar.showMessage(f'Inference: {inference_time:.0f} ms, Confidence: {confidence:.2f}')
 
 def on_error(window, msg):
-    logging.error(f"Worker error: {msg}")
-    window.current_worker = None
+    logging.error("Worker error: %s", msg)
+    window.retract_partial_answer()
     logging.info("Error handled, app continues running")
     if msg == 'auth':
         QMessageBox.warning(window, 'Invalid API Key', 'Invalid OpenRouter API key')
@@ -161,6 +286,12 @@ def on_error(window, msg):
     elif msg == 'no_response':
         color = "amber"
         text = "No response"
+    elif msg == 'circuit_open':
+        color = "amber"
+        text = "Model unavailable, retry shortly"
+    elif msg == 'request_error':
+        color = "red"
+        text = "Request rejected, check model and credits"
     elif msg == 'parse_error':
         color = "red"
         text = "Parse error"
@@ -173,16 +304,29 @@ def on_error(window, msg):
     window.status_bar.showMessage('Error')
 
 if __name__ == '__main__':
+    setup_logging(load_config().get('debug_logging', False))
     logging.info("Starting QuizPeek application")
     try:
         app = QApplication(sys.argv)
         app.setQuitOnLastWindowClosed(False)
         logging.info("QApplication created successfully")
     except Exception as e:
-        logging.error(f"Failed to create QApplication: {e}")
+        logging.error("Failed to create QApplication: %s", e)
         sys.exit(1)
+    app.aboutToQuit.connect(get_capture_session().close)
     window = MainWindow()
-    window.hotkeyStartRequested.connect(lambda combo: register(combo, lambda: hotkey_callback(window)))
-    window.hotkeyStopRequested.connect(lambda: unregister(window.hotkey_input.text()))
+    worker = Worker(window.config)
+    worker.finished.connect(window.answerReady)
+    worker.partial.connect(window.partialAnswerReady)
+    worker.stats.connect(window.metricsUpdated)
+    worker.error.connect(lambda msg: on_error(window, msg))
+    window.pipeline_worker = worker
+    worker.start()
+    app.aboutToQuit.connect(worker.stop)
+    app.aboutToQuit.connect(lambda: worker.wait(2000))
+    window.hotkeyStartRequested.connect(lambda combo: start_hotkeys(window, combo))
+    window.hotkeyStopRequested.connect(lambda: stop_hotkeys(window))
+    app.aboutToQuit.connect(worker.precapture.stop)
+    app.aboutToQuit.connect(worker.watcher.stop)
     window.hide()
     sys.exit(app.exec())
\ No newline at end of file
@@ -0,0 +1,210 @@
+"""
+Answers a folder or glob of saved screenshots without the GUI.
+
+Each image goes through the same steps as a hotkey press (crop_percent, then
+pipeline.answer_image(): downscale, encode, route and validate_result) on
+a bounded pool of concurrent requests. One row per image is written to
+JSONL or CSV as soon as the image finishes, with the answer and per-stage
+timings. Inputs are read lazily, so thousands of files do not sit in
+memory. Re-running with the same output skips images that already have an
+answer, so an interrupted run picks up where it stopped.
+
+Usage:
+    python batch.py 'captures/*.png' -o results.jsonl [--concurrency 4] [--model MODEL]
+    python batch.py captures/ -o results.csv --config overrides.json
+"""
+import argparse
+import csv
+import glob
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, ALL_COMPLETED, FIRST_COMPLETED
+from PIL import Image
+import metrics
+from capture import crop_percent
+from config import load_config
+from pipeline import answer_image
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.bmp')
+ANSWER_KEYS = ('mode', 'question', 'answer_indices', 'answer_index', 'answer_text', 'answer_entries', 'confidence', 'model_used', 'usage')
+CSV_FIELDS = ['path', 'outcome', *ANSWER_KEYS, 'payload_bytes', *(f"{stage}_ms" for stage in metrics.STAGES)]
+
+
+def _walk(directory: str):
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            yield os.path.join(root, name)
+
+
+def iter_images(patterns: list):
+    """
+    Yields image paths from files, directories and glob patterns, lazily and
+    without duplicates. Directories are walked in sorted order.
+    """
+    seen = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths = _walk(pattern)
+        else:
+            paths = glob.iglob(pattern, recursive=True)
+        for path in paths:
+            if path.lower().endswith(IMAGE_EXTENSIONS) and path not in seen:
+                seen.add(path)
+                yield path
+
+
+def answered_paths(output: str, fmt: str) -> set:
+    """Returns the paths already answered successfully in an earlier run's output."""
+    done = set()
+    try:
+        with open(output, newline='') as f:
+            if fmt == 'csv':
+                rows = csv.DictReader(f)
+            else:
+                rows = (json.loads(line) for line in f if line.strip())
+            for row in rows:
+                if row.get('outcome') == 'ok':
+                    done.add(row['path'])
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        logging.warning("Could not read %s to resume: %s", output, e)
+    return done
+
+
+def answer_file(path: str, config: dict) -> dict:
+    """Runs one saved screenshot through the pipeline; returns its output row."""
+    trace = metrics.Trace(path)
+    with metrics.tracing(trace):
+        try:
+            with Image.open(path) as img:
+                img = img.convert('RGB')
+            img = crop_percent(img, config['top_crop_pct'], config['bottom_crop_pct'])
+            result, error = answer_image(img, config, config.get('request_deadline_s', 20.0))
+        except OSError as e:
+            logging.error("Could not read %s: %s", path, e)
+            result, error = None, 'unreadable'
+    record = trace.to_record()
+    row = {'path': path, 'outcome': error or 'ok', 'payload_bytes': record.get('payload_bytes'),
+           'spans_ms': record['spans_ms']}
+    if result is not None:
+        row.update({key: result[key] for key in ANSWER_KEYS if key in result})
+    return row
+
+
+class ResultWriter:
+    """Appends rows to a JSONL or CSV file, flushing each one."""
+
+    def __init__(self, output: str, fmt: str, append: bool):
+        exists = append and os.path.exists(output) and os.path.getsize(output) > 0
+        self.fmt = fmt
+        self.file = open(output, 'a' if append else 'w', newline='')
+        if fmt == 'csv':
+            self.csv = csv.DictWriter(self.file, CSV_FIELDS, extrasaction='ignore')
+            if not exists:
+                self.csv.writeheader()
+
+    def write(self, row: dict) -> None:
+        if self.fmt == 'csv':
+            flat = {key: json.dumps(value) if isinstance(value, (list, dict)) else value for key, value in row.items()}
+            for stage, ms in row['spans_ms'].items():
+                flat[f"{stage}_ms"] = round(ms, 2)
+            self.csv.writerow(flat)
+        else:
+            self.file.write(json.dumps(row) + '\n')
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def run_batch(paths, config: dict, writer: ResultWriter, concurrency: int = 4, skip: set = frozenset()) -> dict:
+    """
+    Answers the images with at most `concurrency` in flight, writing each row
+    as it completes.
+
+    Returns:
+        dict: Outcome counts, plus 'skipped' for already answered images.
+    """
+    counts = {'skipped': 0}
+    in_flight = set()
+
+    def drain(return_when):
+        done, _ = wait(in_flight, return_when=return_when)
+        for future in done:
+            in_flight.discard(future)
+            row = future.result()
+            writer.write(row)
+            counts[row['outcome']] = counts.get(row['outcome'], 0) + 1
+            logging.info("%s: %s in %.0f ms", row['path'], row['outcome'], row['spans_ms']['total'])
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='batch') as pool:
+        try:
+            for path in paths:
+                if path in skip:
+                    counts['skipped'] += 1
+                    continue
+                # Only `concurrency` images are ever read ahead
+                while len(in_flight) >= concurrency:
+                    drain(FIRST_COMPLETED)
+                in_flight.add(pool.submit(answer_file, path, config))
+            if in_flight:
+                drain(ALL_COMPLETED)
+        except KeyboardInterrupt:
+            logging.warning("Interrupted; waiting for %d request(s) in flight", len(in_flight))
+            pool.shutdown(wait=True, cancel_futures=True)
+            drain(ALL_COMPLETED)
+            raise
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('inputs', nargs='+', help='image files, directories or glob patterns')
+    parser.add_argument('-o', '--output', required=True, help='results file (.jsonl or .csv)')
+    parser.add_argument('--format', choices=('jsonl', 'csv'), help='defaults to the output extension')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--model', help='overrides the configured model')
+    parser.add_argument('--config', help='JSON file with config overrides')
+    parser.add_argument('--api-key', default=os.environ.get('OPENROUTER_API_KEY'))
+    parser.add_argument('--cache', action='store_true', help='use the answer cache (off by default)')
+    parser.add_argument('--no-resume', action='store_true', help='overwrite the output instead of resuming')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    config = load_config()
+    if args.config:
+        with open(args.config) as f:
+            config.update(json.load(f))
+    if args.model:
+        config['model'] = args.model
+    if args.api_key:
+        config['api_key'] = args.api_key
+    config['cache_enabled'] = args.cache
+    if not config.get('api_key'):
+        parser.error('no API key: pass --api-key, set OPENROUTER_API_KEY or save one in the app')
+
+    fmt = args.format or ('csv' if args.output.lower().endswith('.csv') else 'jsonl')
+    skip = set() if args.no_resume else answered_paths(args.output, fmt)
+    if skip:
+        logging.info("Resuming: %d image(s) already answered in %s", len(skip), args.output)
+    writer = ResultWriter(args.output, fmt, append=not args.no_resume)
+    start = time.perf_counter()
+    try:
+        counts = run_batch(iter_images(args.inputs), config, writer, args.concurrency, skip)
+    except KeyboardInterrupt:
+        sys.exit(130)
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - start
+    answered = sum(n for outcome, n in counts.items() if outcome != 'skipped')
+    print(f"{answered} image(s) in {elapsed:.1f} s ({answered / elapsed if elapsed else 0.0:.2f}/s): "
+          + ', '.join(f"{k} {v}" for k, v in sorted(counts.items())))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmarks downscale_max_width() filters and reducing gaps at common
+monitor resolutions, and checks that quiz text stays legible at the
+target max_width.
+
+Legibility is checked two ways: the height of a capital "H" rendered at
+the page's text size and downscaled with the same filter and gap, measured
+as the ink bounding box on the output, must stay above --min-glyph-px, and
+the PSNR of the result against the single-pass LANCZOS reference must stay
+above --min-psnr. The script exits non-zero if any configuration fails.
+
+Usage:
+    python benchmarks/bench_downscale.py [--max-width 1024] [--repeat 10]
+"""
+import argparse
+import math
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import ImageChops, ImageStat
+
+from capture import RESAMPLE_FILTERS, crop_percent, downscale_max_width
+from config import DEFAULTS
+from samples import reference_glyph, synthetic_quiz
+
+RESOLUTIONS = [
+    (1366, 768),
+    (1920, 1080),
+    (2560, 1440),
+    (3440, 1440),
+    (3840, 2160),
+]
+GAPS = [None, 3.0, 2.0, 1.5]
+# Typical LMS body text is around 16 CSS px at 100% zoom
+TEXT_PX_AT_1080P = 24
+# Pixels darker than this count as ink when measuring a glyph
+INK_THRESHOLD = 128
+
+
+def psnr(a, b) -> float:
+    diff = ImageChops.difference(a.convert('L'), b.convert('L'))
+    mse = ImageStat.Stat(diff).rms[0] ** 2
+    return float('inf') if mse == 0 else 20 * math.log10(255 / math.sqrt(mse))
+
+
+def ink_height(img) -> int:
+    """Height in pixels of the bounding box of the dark pixels in img."""
+    bbox = img.convert('L').point(lambda v: 255 if v < INK_THRESHOLD else 0).getbbox()
+    return bbox[3] - bbox[1] if bbox else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--max-width', type=int, default=DEFAULTS['max_width'])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--min-psnr', type=float, default=30.0)
+    # Cap height, not font size: a 9 px font has an "H" about 6.5 px tall
+    parser.add_argument('--min-glyph-px', type=int, default=6)
+    args = parser.parse_args()
+
+    failures = 0
+    print(f"{'resolution':<11} {'filter':<9} {'gap':>5} {'median ms':>10} {'PSNR dB':>8} {'glyph px':>9}  check")
+    for width, height in RESOLUTIONS:
+        text_px = TEXT_PX_AT_1080P * height // 1080
+        img = crop_percent(synthetic_quiz(width, height, text_px), DEFAULTS['top_crop_pct'], DEFAULTS['bottom_crop_pct'])
+        reference = downscale_max_width(img, args.max_width, 'lanczos', None)
+        glyph = reference_glyph(img.width, text_px)
+        for name in RESAMPLE_FILTERS:
+            for gap in GAPS:
+                timings = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    out = downscale_max_width(img, args.max_width, name, gap)
+                    timings.append((time.perf_counter() - start) * 1000)
+                quality = psnr(out, reference)
+                glyph_px = ink_height(downscale_max_width(glyph, args.max_width, name, gap))
+                ok = quality >= args.min_psnr and glyph_px >= args.min_glyph_px
+                failures += not ok
+                print(f"{width}x{height:<6} {name:<9} {gap or '-':>5} {statistics.median(timings):>10.2f} "
+                      f"{quality:>8.1f} {glyph_px:>9d}  {'ok' if ok else 'FAIL'}")
+    if failures:
+        print(f"{failures} configuration(s) failed the legibility check")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+"""
+Micro-benchmark and fuzz checks for json_extract.extract_json().
+
+The benchmark times extraction on typical response shapes (clean JSON,
+fenced, wrapped in prose, needing repair) next to the old parsing in
+call_openrouter(), which stripped a leading code fence and called
+json.loads(). Cases the old parsing rejected are marked.
+
+With --fuzz N it also checks properties on N random answers:
+- an answer rendered with any mix of fences, preambles (including stray
+  braces and apostrophes), trailing notes, trailing commas, single quotes
+  and Python literals is extracted unchanged
+- no proper prefix of a rendered answer (a response cut off by max_tokens)
+  yields an object
+- random text never raises
+- deeply nested invalid or unclosed objects are rejected in linear time
+It exits non-zero on the first failure, printing the seed and input, so it
+can gate CI.
+
+Usage:
+    python benchmarks/bench_json_extract.py [--number 20000] [--fuzz 2000] [--seed 1]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from json_extract import extract_json
+from fake_openrouter import CANNED_ANSWERS
+
+ANSWER = CANNED_ANSWERS['mcq']
+CLEAN = json.dumps(ANSWER)
+CASES = {
+    'clean': CLEAN,
+    'fenced': f"```json\n{json.dumps(ANSWER, indent=2)}\n```",
+    'prose': f"Here is the answer to the topmost question:\n\n```json\n{CLEAN}\n```\n\nEquipment is a long-term asset.",
+    'repaired': "{'mode': 'mcq', 'question': 'Which is NOT a current asset?', 'choices': ['Cash', 'Equipment',],"
+                " 'answer_indices': [1,], 'confidence': 0.9, 'multi': False,}",
+    'journal': "Sure! " + json.dumps(CANNED_ANSWERS['journal']) + " Let me know if you need more.",
+}
+
+PREAMBLES = ['', 'Here is the JSON:\n', 'Sure! ', '```json\n', '```\n', 'Answer:\n```json\n', 'The answer is below. [1]\n',
+             'Note: the set {1, 2 is open. Answer:\n```json\n', "prefix { don't do this. ok ", "Don't worry, it's below:\n",
+             'Use {placeholders} like {this}. ']
+SUFFIXES = ['', '\n```', '\n```\nHope this helps!', ' (confidence is an estimate)', '\n\nNote: option C is a long-term asset.']
+ALPHABET = 'abcXYZ 019 .,:;!?-$%()[]{}\'"\\/\n\téü✓'
+
+
+def legacy_parse(content: str):
+    """The parsing call_openrouter() did before extract_json()."""
+    if content.strip().startswith('```json'):
+        content = content.strip()[7:]
+        if content.endswith('```'):
+            content = content[:-3]
+        content = content.strip()
+    elif content.strip().startswith('```'):
+        content = content.strip()[3:]
+        if content.endswith('```'):
+            content = content[:-3]
+        content = content.strip()
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        return None
+
+
+def random_string(rng: random.Random) -> str:
+    return ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 24)))
+
+
+def random_value(rng: random.Random, depth: int = 0):
+    kind = rng.choice(['str', 'int', 'float', 'bool', 'null', 'list', 'dict'] if depth < 2 else ['str', 'int', 'bool'])
+    if kind == 'str':
+        return random_string(rng)
+    if kind == 'int':
+        return rng.randint(-1000, 1000)
+    if kind == 'float':
+        return round(rng.uniform(0, 1), 3)
+    if kind == 'bool':
+        return rng.random() < 0.5
+    if kind == 'null':
+        return None
+    if kind == 'list':
+        return [random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+    return {random_string(rng): random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))}
+
+
+def random_answer(rng: random.Random) -> dict:
+    answer = {
+        'mode': rng.choice(['mcq', 'tf', 'fitb', 'journal']),
+        'question': random_string(rng),
+        'choices': [random_string(rng) for _ in range(rng.randint(0, 5))],
+        'answer_indices': [rng.randint(0, 4)],
+        'confidence': round(rng.random(), 2),
+    }
+    for _ in range(rng.randint(0, 3)):
+        answer[random_string(rng)] = random_value(rng)
+    return answer
+
+
+def render(value, rng: random.Random, single_quotes: bool, trailing_commas: bool, python_literals: bool, indent: bool) -> str:
+    """Serializes value like a sloppy model might, with the chosen deviations from JSON."""
+    if isinstance(value, dict) or isinstance(value, list):
+        if isinstance(value, dict):
+            items = [render(k, rng, single_quotes, trailing_commas, python_literals, indent) + ': '
+                     + render(v, rng, single_quotes, trailing_commas, python_literals, indent) for k, v in value.items()]
+            opener, closer = '{', '}'
+        else:
+            items = [render(v, rng, single_quotes, trailing_commas, python_literals, indent) for v in value]
+            opener, closer = '[', ']'
+        sep = ',\n  ' if indent else ', '
+        body = sep.join(items)
+        if trailing_commas and items:
+            body += ','
+        return opener + ('\n  ' if indent else '') + body + ('\n' if indent else '') + closer
+    if isinstance(value, str):
+        text = json.dumps(value, ensure_ascii=rng.random() < 0.5)
+        if single_quotes:
+            text = "'" + text[1:-1].replace('\\"', '"').replace("'", "\\'") + "'"
+        return text
+    if python_literals and (value is None or isinstance(value, bool)):
+        return repr(value)
+    return json.dumps(value)
+
+
+def fuzz(iterations: int, seed: int) -> int:
+    rng = random.Random(seed)
+    checks = 0
+    for _ in range(iterations):
+        answer = random_answer(rng)
+        style = [rng.random() < 0.4 for _ in range(4)]
+        body = render(answer, rng, *style)
+        text = rng.choice(PREAMBLES) + body + rng.choice(SUFFIXES)
+        got = extract_json(text)
+        if got != answer:
+            return _fail(seed, 'round trip', text, got)
+        cut = rng.randint(1, len(body) - 1)
+        got = extract_json(rng.choice(PREAMBLES) + body[:cut])
+        if got is not None:
+            return _fail(seed, 'truncated prefix', body[:cut], got)
+        noise = ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 80)))
+        try:
+            extract_json(noise)
+        except Exception as e:
+            return _fail(seed, 'random text', noise, repr(e))
+        checks += 3
+    for depth in (300, 3000):
+        for nested in ('{ x ' * depth + '}' * depth, '{"a": ' * depth, "{ don't " * depth):
+            start = timeit.default_timer()
+            got = extract_json(nested)
+            elapsed = timeit.default_timer() - start
+            if got is not None or elapsed > depth * 1e-4:
+                return _fail(seed, f'nested invalid depth {depth} ({elapsed * 1000:.0f} ms)', nested[:40] + '...', got)
+            checks += 1
+    print(f"fuzz: {checks} checks passed (seed {seed})")
+    return 0
+
+
+def _fail(seed: int, prop: str, text: str, got) -> int:
+    print(f"fuzz: {prop} failed (seed {seed})\n  input: {text!r}\n  got:   {got!r}", file=sys.stderr)
+    return 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--number', type=int, default=20000, help='calls per timing')
+    parser.add_argument('--fuzz', type=int, default=0, help='random answers to check properties on')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'case':<10} {'bytes':>6} {'extract us':>11} {'legacy us':>10}")
+    for name, text in CASES.items():
+        if extract_json(text) is None:
+            print(f"{name}: extract_json() found no object", file=sys.stderr)
+            return 1
+        extract_us = timeit.timeit(lambda: extract_json(text), number=args.number) / args.number * 1e6
+        legacy_us = timeit.timeit(lambda: legacy_parse(text), number=args.number) / args.number * 1e6
+        legacy = f"{legacy_us:>10.1f}" if legacy_parse(text) is not None else f"{'fails':>10}"
+        print(f"{name:<10} {len(text):>6} {extract_us:>11.1f} {legacy}")
+    if args.fuzz:
+        return fuzz(args.fuzz, args.seed)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
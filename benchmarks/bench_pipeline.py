@@ -0,0 +1,130 @@
+"""
+End-to-end latency and throughput of the hotkey pipeline without the GUI.
+
+Each image is cropped like a hotkey capture and then run through
+pipeline.answer_image(), covering the downscale, encode, route and
+validate_result() steps. By default the requests go to the local stand-in
+from fake_openrouter.py, so the run needs no display, network or API key
+and works on a headless CI runner. It reports
+throughput, per-stage p50/p95/p99 and outcome counts.
+
+With --max-p95-ms or --max-error-rate it exits non-zero when the run is
+slower or less reliable than the limit, so it can gate CI.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--images 'shots/*.png'] [--presses 50] [--concurrency 1]
+        [--latency lognormal:0.8,0.4] [--errors 500=0.05,fenced=0.2] [--stream]
+        [--max-p95-ms 2500] [--max-error-rate 0.05] [--json]
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+from capture import crop_percent
+from config import DEFAULTS
+from pipeline import answer_image
+from fake_openrouter import Behaviour, FakeOpenRouter
+from samples import load_samples
+
+
+def run_press(press_id: int, img, config: dict) -> dict:
+    trace = metrics.Trace(press_id)
+    with metrics.tracing(trace):
+        img = crop_percent(img, config['top_crop_pct'], config['bottom_crop_pct'])
+        result, error = answer_image(img, config, config['request_deadline_s'])
+    trace.set('outcome', error or ('cached' if result.get('cached') else 'ok'))
+    return trace.to_record()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', help='glob of screenshots; a synthetic quiz is used if omitted')
+    parser.add_argument('--presses', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--latency', default='lognormal:0.8,0.4', help='stand-in latency distribution')
+    parser.add_argument('--errors', default='', help='stand-in fault rates, e.g. 500=0.05,timeout=0.02')
+    parser.add_argument('--mode', default='mcq,tf,fitb,journal', help='stand-in answer modes')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--stream', action='store_true')
+    parser.add_argument('--cache', action='store_true', help='enable the answer cache (off by default)')
+    parser.add_argument('--config', help='JSON file with config overrides, e.g. encoder settings')
+    parser.add_argument('--url', help='real endpoint instead of the stand-in')
+    parser.add_argument('--api-key', default=os.environ.get('OPENROUTER_API_KEY', 'fake-key'))
+    parser.add_argument('--max-p95-ms', type=float, help='fail if end-to-end p95 exceeds this')
+    parser.add_argument('--max-error-rate', type=float, help='fail if the share of failed presses exceeds this')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args()
+
+    config = dict(DEFAULTS)
+    if args.config:
+        with open(args.config) as f:
+            config.update(json.load(f))
+    config.update({
+        'api_key': args.api_key,
+        'stream_responses': args.stream,
+        'cache_enabled': args.cache,
+    })
+    samples = list(load_samples(args.images, 1920, 1080))
+
+    behaviour = Behaviour(args.latency, args.errors, args.mode.split(','), hang_s=config['request_deadline_s'] + 5,
+                          seed=args.seed)
+    server = contextlib.nullcontext() if args.url else FakeOpenRouter(behaviour=behaviour)
+    with server as fake:
+        config['api_url'] = args.url or fake.url
+        stats = metrics.LatencyStats(window=max(args.presses, 1))
+        outcomes = Counter()
+        inputs = itertools.islice(itertools.cycle(samples), args.presses)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            futures = [pool.submit(run_press, i, img, config) for i, (_, img) in enumerate(inputs)]
+            for future in futures:
+                record = future.result()
+                stats.record(record)
+                outcomes[record['outcome']] += 1
+        wall_s = time.perf_counter() - start
+
+    failed = sum(n for outcome, n in outcomes.items() if outcome not in ('ok', 'cached'))
+    report = {
+        'endpoint': config['api_url'],
+        'presses': args.presses,
+        'concurrency': args.concurrency,
+        'wall_s': wall_s,
+        'throughput_per_s': args.presses / wall_s if wall_s else 0.0,
+        'outcomes': dict(outcomes),
+        'error_rate': failed / args.presses if args.presses else 0.0,
+        'stages_ms': stats.snapshot(),
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"endpoint: {report['endpoint']}")
+        print(f"{args.presses} presses, concurrency {args.concurrency}: {wall_s:.2f} s, "
+              f"{report['throughput_per_s']:.2f} presses/s")
+        print("outcomes: " + ', '.join(f"{k} {v}" for k, v in sorted(outcomes.items())))
+        print(f"{'stage':<12} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for stage, summary in report['stages_ms'].items():
+            print(f"{stage:<12} {summary['count']:>6} {summary['p50']:>9.1f} {summary['p95']:>9.1f} {summary['p99']:>9.1f}")
+
+    failures = []
+    total = report['stages_ms'].get('total', {})
+    if args.max_p95_ms is not None and total.get('p95', 0.0) > args.max_p95_ms:
+        failures.append(f"p95 {total['p95']:.0f} ms exceeds {args.max_p95_ms:.0f} ms")
+    if args.max_error_rate is not None and report['error_rate'] > args.max_error_rate:
+        failures.append(f"error rate {report['error_rate']:.1%} exceeds {args.max_error_rate:.1%}")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
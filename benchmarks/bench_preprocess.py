@@ -0,0 +1,75 @@
+"""
+Measures what the reduce_colors() stage buys between downscale and encode:
+payload bytes, preprocess + encode time, and end-to-end latency with the
+stage on and off.
+
+Upload time is modelled from the base64 payload size and --uplink-mbps.
+With --api-key the payload is also sent to OpenRouter so the end-to-end
+column includes real model latency (and the answers can be compared).
+
+Usage:
+    python benchmarks/bench_preprocess.py [--images 'shots/*.png'] [--encoder png]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from capture import crop_percent, downscale_max_width, reduce_colors
+from config import DEFAULTS
+from encoder import encode_data_url
+from samples import load_samples
+
+VARIANTS = [
+    ('off', 'none', 16, False),
+    ('grayscale', 'grayscale', 16, False),
+    ('grayscale+ac', 'grayscale', 16, True),
+    ('palette16', 'palette', 16, False),
+    ('palette16+ac', 'palette', 16, True),
+    ('palette4', 'palette', 4, False),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', help='glob of screenshots; a synthetic quiz is used if omitted')
+    parser.add_argument('--encoder', default='png')
+    parser.add_argument('--quality', type=int, default=85)
+    parser.add_argument('--max-width', type=int, default=DEFAULTS['max_width'])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--uplink-mbps', type=float, default=10.0)
+    parser.add_argument('--api-key', default=os.environ.get('OPENROUTER_API_KEY', ''))
+    parser.add_argument('--model', default=DEFAULTS['model'])
+    args = parser.parse_args()
+
+    print(f"{'image':<28} {'variant':<14} {'bytes':>9} {'prep ms':>8} {'enc ms':>8} {'upload ms':>10} {'e2e ms':>9}  answer")
+    for name, img in load_samples(args.images, 3840, 2160):
+        img = crop_percent(img, DEFAULTS['top_crop_pct'], DEFAULTS['bottom_crop_pct'])
+        img = downscale_max_width(img, args.max_width)
+        for label, mode, colors, autocontrast in VARIANTS:
+            prep_ms, enc_ms = [], []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                processed = reduce_colors(img, mode, colors, autocontrast)
+                prep_ms.append((time.perf_counter() - start) * 1000)
+                data_url, stats = encode_data_url(processed, args.encoder, args.quality)
+                enc_ms.append(stats['encode_ms'])
+            upload_ms = len(data_url) * 8 / (args.uplink_mbps * 1e6) * 1000
+            e2e_ms = statistics.median(prep_ms) + statistics.median(enc_ms) + upload_ms
+            answer = ''
+            if args.api_key:
+                from router import call_openrouter
+                start = time.perf_counter()
+                result = call_openrouter(data_url, args.model, args.api_key, False, 60.0)
+                # The modelled upload is already part of the real round trip
+                e2e_ms += (time.perf_counter() - start) * 1000 - upload_ms
+                answer = str(result.get('answer_indices', result.get('answer_text', result.get('error', ''))))
+            print(f"{name[:28]:<28} {label:<14} {stats['bytes']:>9} {statistics.median(prep_ms):>8.1f} "
+                  f"{statistics.median(enc_ms):>8.1f} {upload_ms:>10.1f} {e2e_ms:>9.1f}  {answer}")
+
+
+if __name__ == '__main__':
+    main()
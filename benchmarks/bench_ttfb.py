@@ -0,0 +1,84 @@
+"""
+Measures time-to-first-byte of call_openrouter() with a fresh connection
+per call (the old bare requests.post behaviour) against the pooled
+keep-alive session after prewarm().
+
+By default it runs against a local HTTPS stand-in (see fake_openrouter.py)
+so the TLS handshake is part of the cold numbers. Pass --url and
+--api-key to measure the real endpoint.
+
+Usage:
+    python benchmarks/bench_ttfb.py [--calls 20] [--url URL --api-key KEY]
+"""
+import argparse
+import contextlib
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+import router
+from fake_openrouter import FakeOpenRouter
+
+# 1x1 PNG keeps the upload out of the measurement
+TINY_PNG = ("data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8"
+            "z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg==")
+
+
+def timed_calls(n: int, url: str, api_key: str, model: str, make_session) -> list:
+    ttfb = []
+    for _ in range(n):
+        session = make_session()
+        original_post = session.post
+
+        def post(*args, **kwargs):
+            response = original_post(*args, **kwargs)
+            ttfb.append(response.elapsed.total_seconds() * 1000)
+            return response
+
+        session.post = post
+        router.call_openrouter(TINY_PNG, model, api_key, False, 30.0, session=session, api_url=url)
+        session.post = original_post
+    return ttfb
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=20)
+    parser.add_argument('--url')
+    parser.add_argument('--api-key', default=os.environ.get('OPENROUTER_API_KEY', 'fake-key'))
+    parser.add_argument('--model', default='meta-llama/llama-3.2-90b-vision-instruct')
+    args = parser.parse_args()
+
+    server = contextlib.nullcontext() if args.url else FakeOpenRouter(tls=True)
+    with server as fake:
+        url = args.url or fake.url
+        verify = fake.cert if fake is not None else True
+
+        def cold_session():
+            session = requests.Session()
+            session.verify = verify
+            return session
+
+        pooled = router.get_http_session()
+        pooled.verify = verify
+
+        cold = timed_calls(args.calls, url, args.api_key, args.model, cold_session)
+        start = time.perf_counter()
+        router.prewarm(url)
+        prewarm_ms = (time.perf_counter() - start) * 1000
+        warm = timed_calls(args.calls, url, args.api_key, args.model, lambda: pooled)
+
+    print(f"endpoint: {url}")
+    print(f"prewarm: {prewarm_ms:.1f} ms")
+    for label, values in (('fresh connection', cold), ('pooled + prewarm', warm)):
+        print(f"{label:<18} median {statistics.median(values):7.1f} ms   "
+              f"p95 {sorted(values)[int(0.95 * (len(values) - 1))]:7.1f} ms   max {max(values):7.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,309 @@
+"""
+Local stand-in for the OpenRouter chat completions endpoint.
+
+Serves canned answers over HTTP/1.1 keep-alive, as plain JSON or as an SSE
+stream when the request sets "stream": true, optionally over TLS with a
+throwaway self-signed certificate, so router code can be exercised and
+timed without touching openrouter.ai.
+
+Response latency is drawn from a configurable distribution, and a share of
+requests can be answered with injected faults: 401, 429, 5xx, a hang past
+the client timeout, malformed JSON, content wrapped in a ```json fence, an
+answer cut off with finish_reason "length", or a 400 for requests that ask
+for a response_format. Answers longer than the request's max_tokens (at
+about four characters per token) are cut off the same way.
+
+Usage:
+    python benchmarks/fake_openrouter.py [--port 8787] [--tls] [--mode mcq,tf]
+        [--latency lognormal:0.8,0.4] [--errors 500=0.05,timeout=0.02,fenced=0.2]
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CANNED_ANSWERS = {
+    "mcq": {
+        "mode": "mcq",
+        "question": "Which of the following is NOT a current asset on the balance sheet?",
+        "choices": ["Accounts receivable", "Prepaid insurance", "Equipment", "Merchandise inventory"],
+        "answer_indices": [2],
+        "confidence": 0.93,
+    },
+    "tf": {
+        "mode": "tf",
+        "question": "Depreciation expense reduces net income but does not use cash.",
+        "choices": ["True", "False"],
+        "answer_index": 0,
+        "confidence": 0.9,
+    },
+    "fitb": {
+        "mode": "fitb",
+        "question": "Assets = Liabilities + ______",
+        "answer_text": "Equity",
+        "confidence": 0.95,
+    },
+    "journal": {
+        "mode": "journal",
+        "question": "Purchased supplies on account for $500.",
+        "answer_entries": ["Supplies D 500", "Accounts Payable C 500"],
+        "confidence": 0.88,
+    },
+}
+CANNED_ANSWER = CANNED_ANSWERS["mcq"]
+
+# Injectable faults; anything not drawn is a normal answer
+FAULTS = ("401", "429", "500", "502", "503", "timeout", "malformed", "fenced", "truncated", "unsupported")
+
+
+def parse_latency(spec: str):
+    """
+    Parses a latency distribution into a sampler returning seconds.
+
+    Accepted forms: 'fixed:S', 'uniform:LO,HI', 'normal:MEAN,SD' and
+    'lognormal:MEDIAN,SIGMA' (sigma of the underlying normal).
+    """
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",") if v]
+    if kind == "fixed" and len(values) == 1:
+        return lambda: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda: random.uniform(*values)
+    if kind == "normal" and len(values) == 2:
+        return lambda: max(0.0, random.gauss(*values))
+    if kind == "lognormal" and len(values) == 2:
+        median, sigma = values
+        return lambda: median * random.lognormvariate(0.0, sigma)
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def parse_errors(spec: str) -> dict:
+    """Parses 'fault=rate,...' into {fault: rate}; rates must sum to at most 1."""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        fault, _, rate = item.partition("=")
+        if fault not in FAULTS:
+            raise ValueError(f"Unknown fault {fault}; expected one of {', '.join(FAULTS)}")
+        rates[fault] = float(rate)
+    if sum(rates.values()) > 1.0:
+        raise ValueError("Fault rates add up to more than 1")
+    return rates
+
+
+class Behaviour:
+    """
+    What the stand-in does per request.
+
+    Attributes:
+        latency (callable): Returns the delay in seconds before the response
+                            (spread across the chunks when streaming).
+        errors (dict): {fault: probability} for the faults in FAULTS.
+        modes (list): Answer modes served round-robin from CANNED_ANSWERS.
+        hang_s (float): How long a 'timeout' fault holds the request open.
+    """
+
+    def __init__(self, latency: str = "fixed:0", errors: str = "", modes=("mcq",), hang_s: float = 60.0, seed=None):
+        self.latency = parse_latency(latency)
+        self.errors = parse_errors(errors)
+        self.modes = list(modes)
+        unknown = [m for m in self.modes if m not in CANNED_ANSWERS]
+        if unknown or not self.modes:
+            raise ValueError(f"Unknown answer modes {unknown}; expected some of {', '.join(CANNED_ANSWERS)}")
+        self.hang_s = hang_s
+        self._modes = itertools.cycle(self.modes)
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+
+    def next_answer(self) -> dict:
+        with self._lock:
+            return CANNED_ANSWERS[next(self._modes)]
+
+    def draw_fault(self) -> str | None:
+        with self._lock:
+            roll = self._random.random()
+        for fault, rate in self.errors.items():
+            if roll < rate:
+                return fault
+            roll -= rate
+        return None
+
+
+def fake_usage(request_bytes: int, content: str) -> dict:
+    """Rough token accounting: about four bytes per token."""
+    prompt, completion = request_bytes // 4, len(content) // 4
+    return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion, "cost": 0.0}
+
+
+def completion_body(content: str, model: str = "fake/model", usage: dict | None = None, finish_reason: str = "stop") -> dict:
+    return {
+        "id": "gen-fake",
+        "model": model,
+        "object": "chat.completion",
+        "choices": [{"index": 0, "finish_reason": finish_reason, "message": {"role": "assistant", "content": content}}],
+        "usage": usage or {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+class FakeOpenRouterHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: dict):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _send_sse(self, content: str, model: str, delay_s: float = 0.0, usage: dict | None = None, chunk_chars: int = 8,
+                  finish_reason: str = "stop"):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def write_event(text: str):
+            payload = text.encode("utf-8")
+            self.wfile.write(f"{len(payload):x}\r\n".encode("ascii") + payload + b"\r\n")
+            self.wfile.flush()
+
+        write_event(": OPENROUTER PROCESSING\n\n")
+        # Most of the latency is time to first token; the rest is spread
+        # over the chunks
+        chunks = max(1, (len(content) + chunk_chars - 1) // chunk_chars)
+        time.sleep(delay_s * 0.7)
+        for i in range(0, len(content), chunk_chars):
+            time.sleep(delay_s * 0.3 / chunks)
+            delta = {"choices": [{"index": 0, "delta": {"content": content[i:i + chunk_chars]}, "finish_reason": None}],
+                     "model": model}
+            write_event(f"data: {json.dumps(delta)}\n\n")
+        done = {"choices": [{"index": 0, "delta": {}, "finish_reason": finish_reason}], "model": model}
+        if usage:
+            done["usage"] = usage
+        write_event(f"data: {json.dumps(done)}\n\n")
+        write_event("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        model = request.get("model", "fake/model")
+        behaviour = getattr(self.server, "behaviour", None) or Behaviour()
+        fault = behaviour.draw_fault()
+        delay_s = behaviour.latency()
+        content = json.dumps(behaviour.next_answer())
+        if fault == "timeout":
+            time.sleep(behaviour.hang_s)
+            self.close_connection = True
+            return
+        if fault in ("401", "429", "500", "502", "503"):
+            time.sleep(delay_s)
+            self._send_json(int(fault), {"error": {"code": int(fault), "message": f"injected {fault}"}})
+            return
+        if fault == "unsupported" and "response_format" in request:
+            time.sleep(delay_s)
+            self._send_json(400, {"error": {"code": 400, "message": "injected: response_format is not supported"}})
+            return
+        finish_reason = "stop"
+        if fault == "malformed":
+            content = content[:len(content) // 2]
+        elif fault == "fenced":
+            content = f"```json\n{content}\n```"
+        elif fault == "truncated":
+            content, finish_reason = content[:len(content) // 2], "length"
+        max_chars = int(request.get("max_tokens") or 0) * 4
+        if max_chars and len(content) > max_chars:
+            content, finish_reason = content[:max_chars], "length"
+        usage = fake_usage(length, content)
+        if request.get("stream"):
+            self._send_sse(content, model, delay_s, usage, finish_reason=finish_reason)
+        else:
+            time.sleep(delay_s)
+            self._send_json(200, completion_body(content, model, usage, finish_reason))
+
+
+def make_self_signed_cert(directory: str) -> tuple[str, str]:
+    """Creates a localhost certificate with the openssl CLI; returns (cert, key) paths."""
+    cert = os.path.join(directory, "cert.pem")
+    key = os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-keyout", key, "-out", cert,
+         "-days", "1", "-subj", "/CN=localhost", "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1"],
+        check=True, capture_output=True,
+    )
+    return cert, key
+
+
+class FakeOpenRouter:
+    """
+    Runs the stand-in server on a background thread.
+
+    Attributes:
+        url (str): Chat completions URL to pass to call_openrouter().
+        cert (str | None): Certificate path for requests' `verify` when TLS is on.
+    """
+
+    def __init__(self, port: int = 0, tls: bool = False, handler=FakeOpenRouterHandler, behaviour: Behaviour | None = None):
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self.server.daemon_threads = True
+        self.server.behaviour = behaviour or Behaviour()
+        self.cert = None
+        self._tmpdir = None
+        if tls:
+            self._tmpdir = tempfile.TemporaryDirectory()
+            self.cert, key = make_self_signed_cert(self._tmpdir.name)
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(self.cert, key)
+            self.server.socket = context.wrap_socket(self.server.socket, server_side=True)
+        scheme = "https" if tls else "http"
+        self.url = f"{scheme}://localhost:{self.server.server_address[1]}/api/v1/chat/completions"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+        if self._tmpdir is not None:
+            self._tmpdir.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--tls", action="store_true")
+    parser.add_argument("--latency", default="fixed:0", help="fixed:S, uniform:LO,HI, normal:MEAN,SD or lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--errors", default="", help=f"fault=rate list; faults: {', '.join(FAULTS)}")
+    parser.add_argument("--mode", default="mcq", help=f"comma-separated answer modes: {', '.join(CANNED_ANSWERS)}")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+    behaviour = Behaviour(args.latency, args.errors, args.mode.split(","), seed=args.seed)
+    with FakeOpenRouter(args.port, args.tls, behaviour=behaviour) as fake:
+        print(f"Serving {fake.url}" + (f" (certificate: {fake.cert})" if fake.cert else ""))
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Sample screenshots shared by the benchmarks."""
+import glob
+import os
+
+from PIL import Image, ImageDraw, ImageFont
+
+QUESTION = "Which of the following is NOT a current asset on the balance sheet?"
+CHOICES = [
+    "A. Accounts receivable",
+    "B. Prepaid insurance",
+    "C. Equipment",
+    "D. Merchandise inventory",
+]
+
+
+def _font(size: int):
+    for name in ("DejaVuSans.ttf", "arial.ttf", "Arial.ttf"):
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+def synthetic_quiz(width: int = 1920, height: int = 1080, text_px: int = 0) -> Image.Image:
+    """
+    Renders a quiz-like screenshot: dark text in a centred column on a flat
+    background, with a coloured header bar like a typical LMS page.
+
+    Args:
+        width (int): Image width.
+        height (int): Image height.
+        text_px (int): Font size in pixels; 0 scales it with the height.
+
+    Returns:
+        PIL.Image.Image: The rendered RGB image.
+    """
+    img = Image.new("RGB", (width, height), (246, 247, 249))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((0, 0, width, height // 14), fill=(32, 64, 128))
+    size = text_px or max(12, height // 45)
+    font = _font(size)
+    x = width // 4
+    y = height // 5
+    draw.text((x, y), QUESTION, fill=(20, 20, 20), font=font)
+    for choice in CHOICES:
+        y += int(size * 2.2)
+        draw.ellipse((x - size * 1.5, y + size * 0.2, x - size * 0.7, y + size), outline=(90, 90, 90))
+        draw.text((x, y), choice, fill=(30, 30, 30), font=font)
+    return img
+
+
+def reference_glyph(width: int, text_px: int, glyph: str = "H") -> Image.Image:
+    """
+    Renders a single capital glyph in the quiz font on a blank strip as wide
+    as the screenshot, so it is scaled by the same factor when downscaled.
+
+    Returns:
+        PIL.Image.Image: The rendered RGB image.
+    """
+    img = Image.new("RGB", (width, text_px * 3), (246, 247, 249))
+    ImageDraw.Draw(img).text((width // 2, text_px), glyph, fill=(20, 20, 20), font=_font(text_px))
+    return img
+
+
+def load_samples(pattern: str | None, width: int = 1920, height: int = 1080) -> list:
+    """
+    Loads screenshots matching a glob, or a single synthetic quiz if no
+    pattern is given.
+
+    Returns:
+        list: (name, PIL.Image.Image) pairs.
+    """
+    if not pattern:
+        return [(f"synthetic-{width}x{height}", synthetic_quiz(width, height))]
+    paths = sorted(glob.glob(pattern))
+    if not paths:
+        raise SystemExit(f"No images match {pattern}")
+    return [(os.path.basename(path), Image.open(path).convert("RGB")) for path in paths]
@@ -1,8 +1,169 @@
 import mss
-from PIL import Image
-import pyautogui
+from PIL import Image, ImageOps
 import base64
+import logging
+import threading
+import time
 from io import BytesIO
+import metrics
+
+
+class CaptureSession:
+    """
+    Long-lived screen grabber that keeps an MSS instance per thread and a
+    shared monitor table, so a hotkey press does not pay the platform grab
+    setup and monitor enumeration cost every time.
+
+    MSS grabbers hold per-thread platform handles (the Xlib backend may only
+    be used on the thread that created it), so each thread that grabs gets
+    its own, and only that thread closes it. invalidate() and close() bump a
+    generation; other threads close their outdated grabber on their next
+    grab, or in release() when their loop ends. Grabbers left by threads
+    that have exited are closed by close().
+
+    The monitor table is only rebuilt after invalidate() (the GUI calls it
+    when screens are added, removed or resized) or when the cursor is on
+    none of the cached monitors, so presses normally reuse the grabber.
+
+    All methods are safe to call from any thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._generation = 0
+        # Thread -> grabber, so grabbers of exited threads can be closed
+        self._grabbers = {}
+        self._monitors = None
+        self.last_timings = {}
+
+    def _grabber(self):
+        sct = getattr(self._local, 'sct', None)
+        if sct is not None and self._local.generation != self._generation:
+            self.release()
+            sct = None
+        if sct is None:
+            start = time.perf_counter()
+            sct = mss.mss()
+            self._local.sct = sct
+            self._local.generation = self._generation
+            self._grabbers[threading.current_thread()] = sct
+            logging.info("Capture session opened in %.1f ms on %s", (time.perf_counter() - start) * 1000,
+                         threading.current_thread().name)
+        return sct
+
+    def release(self) -> None:
+        """Closes the calling thread's grabber; long-lived threads call it when they end."""
+        with self._lock:
+            sct = getattr(self._local, 'sct', None)
+            if sct is not None:
+                self._local.sct = None
+                self._grabbers.pop(threading.current_thread(), None)
+                _close_grabber(sct)
+
+    def invalidate(self) -> None:
+        """Drops the grabbers and monitor table; called when the screen layout changes."""
+        with self._lock:
+            logging.info("Capture session invalidated")
+            self._generation += 1
+            self._monitors = None
+            self.release()
+
+    def close(self) -> None:
+        """Releases the platform grab resources of this thread and of threads that have exited."""
+        with self._lock:
+            self._generation += 1
+            self._monitors = None
+            self.release()
+            for thread in [t for t in self._grabbers if not t.is_alive()]:
+                _close_grabber(self._grabbers.pop(thread))
+
+    def monitors(self) -> list:
+        """
+        Returns the cached MSS monitor table, enumerating it when it is
+        missing.
+
+        Returns:
+            list: MSS monitor dictionaries; index 0 is the 'all monitors' entry.
+        """
+        with self._lock:
+            if self._monitors is None:
+                # MSS caches its own monitor list, so whoever drops the table
+                # also bumps the generation to reopen the grabbers and pick
+                # up a layout change
+                self._monitors = [dict(m) for m in self._grabber().monitors]
+            return self._monitors
+
+    def monitor_at(self, x: int, y: int) -> dict:
+        """
+        Finds the monitor containing the given point.
+
+        Args:
+            x (int): Horizontal screen coordinate.
+            y (int): Vertical screen coordinate.
+
+        Returns:
+            dict: MSS monitor dictionary containing the point.
+                  Returns the primary monitor if the point is not on any monitor.
+        """
+        with self._lock:
+            for attempt in range(2):
+                monitors = self.monitors()
+                for monitor in monitors[1:]:  # Skip the first 'all monitors' entry
+                    if (monitor['left'] <= x < monitor['left'] + monitor['width'] and
+                        monitor['top'] <= y < monitor['top'] + monitor['height']):
+                        return monitor
+                if attempt == 0:
+                    # The point is off every cached monitor, so the layout
+                    # has probably changed since the table was built.
+                    self._generation += 1
+                    self._monitors = None
+            # If not found, return primary monitor (index 1)
+            return monitors[1] if len(monitors) > 1 else monitors[0]
+
+    def grab(self, region: dict):
+        """
+        Grabs the given region with the calling thread's grabber.
+
+        Args:
+            region (dict): MSS region with 'left', 'top', 'width' and 'height'.
+
+        Returns:
+            mss.screenshot.ScreenShot: The raw screenshot.
+        """
+        with self._lock:
+            start = time.perf_counter()
+            screenshot = self._grabber().grab(region)
+            grab_ms = (time.perf_counter() - start) * 1000
+            self.last_timings = {'grab_ms': grab_ms}
+        metrics.add_span('grab', int(grab_ms * 1e6))
+        logging.debug("Grabbed %dx%d in %.1f ms", screenshot.width, screenshot.height, grab_ms)
+        return screenshot
+
+
+def _close_grabber(sct):
+    try:
+        sct.close()
+    except Exception as e:
+        logging.warning("Failed to close capture session: %s", e)
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_capture_session() -> CaptureSession:
+    """
+    Returns the process-wide capture session, creating it on first use.
+
+    Returns:
+        CaptureSession: The shared capture session.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = CaptureSession()
+        return _session
 
 
 def detect_monitor_under_mouse() -> dict:
@@ -13,15 +174,11 @@ def detect_monitor_under_mouse() -> dict:
         dict: MSS monitor dictionary containing the cursor position.
               Returns the primary monitor if cursor is not found on any monitor.
     """
+    # pyautogui connects to the display on import, which would stop batch
+    # and benchmark runs on headless machines from importing this module
+    import pyautogui
     cursor_x, cursor_y = pyautogui.position()
-    with mss.mss() as sct:
-        monitors = sct.monitors
-        for monitor in monitors[1:]:  # Skip the first 'all monitors' entry
-            if (monitor['left'] <= cursor_x < monitor['left'] + monitor['width'] and
-                monitor['top'] <= cursor_y < monitor['top'] + monitor['height']):
-                return monitor
-        # If not found, return primary monitor (index 1)
-        return monitors[1] if len(monitors) > 1 else monitors[0]
+    return get_capture_session().monitor_at(cursor_x, cursor_y)
 
 
 def capture_monitor(mon: dict) -> Image.Image:
@@ -34,10 +191,101 @@ def capture_monitor(mon: dict) -> Image.Image:
     Returns:
         PIL.Image.Image: Screenshot of the monitor as a PIL Image.
     """
-    with mss.mss() as sct:
-        screenshot = sct.grab(mon)
-        img = Image.frombytes("RGB", (screenshot.width, screenshot.height), screenshot.rgb)
-        return img
+    screenshot = get_capture_session().grab(mon)
+    start = time.perf_counter_ns()
+    img = screenshot_to_image(screenshot)
+    metrics.add_span('convert', time.perf_counter_ns() - start)
+    return img
+
+
+def screenshot_to_image(screenshot) -> Image.Image:
+    """
+    Converts a raw MSS screenshot to an RGB PIL Image.
+
+    The BGRA buffer is handed straight to Pillow's "BGRX" raw decoder, so the
+    pixels are copied exactly once instead of going through screenshot.rgb
+    (a Python-level shuffle into a new bytes object) and Image.frombytes.
+
+    Args:
+        screenshot (mss.screenshot.ScreenShot): The raw screenshot.
+
+    Returns:
+        PIL.Image.Image: Screenshot as an RGB PIL Image.
+    """
+    return Image.frombuffer("RGB", (screenshot.width, screenshot.height), screenshot.raw, "raw", "BGRX", 0, 1)
+
+
+def percent_box(width: int, height: int, top_pct: int, bot_pct: int) -> tuple:
+    """
+    Computes the box left after cropping top and bottom percentages.
+
+    Args:
+        width (int): Width of the full area.
+        height (int): Height of the full area.
+        top_pct (int): Percentage of the height to crop from the top (0-100).
+        bot_pct (int): Percentage of the height to crop from the bottom (0-100).
+
+    Returns:
+        tuple: (left, top, right, bottom) box relative to the full area.
+    """
+    top_crop = int(height * top_pct / 100)
+    bot_crop = int(height * bot_pct / 100)
+    return (0, top_crop, width, height - bot_crop)
+
+
+def region_from_box(mon: dict, box: tuple) -> dict:
+    """
+    Converts a box relative to a monitor into an MSS grab region.
+
+    Args:
+        mon (dict): MSS monitor dictionary.
+        box (tuple): (left, top, right, bottom) box relative to the monitor.
+
+    Returns:
+        dict: MSS region dictionary covering the box, clamped to the monitor.
+    """
+    left = max(0, min(box[0], mon['width']))
+    top = max(0, min(box[1], mon['height']))
+    right = max(left, min(box[2], mon['width']))
+    bottom = max(top, min(box[3], mon['height']))
+    return {
+        'left': mon['left'] + left,
+        'top': mon['top'] + top,
+        'width': max(1, right - left),
+        'height': max(1, bottom - top),
+    }
+
+
+def capture_region(mon: dict, box: tuple) -> Image.Image:
+    """
+    Captures only the given box of a monitor, so pixels outside it are never
+    read from the framebuffer or converted.
+
+    Args:
+        mon (dict): MSS monitor dictionary specifying the monitor to capture.
+        box (tuple): (left, top, right, bottom) box relative to the monitor.
+
+    Returns:
+        PIL.Image.Image: Screenshot of the box as a PIL Image.
+    """
+    return capture_monitor(region_from_box(mon, box))
+
+
+def capture_cropped(mon: dict, top_pct: int, bot_pct: int) -> Image.Image:
+    """
+    Captures a monitor with the top and bottom percentages already removed.
+    Equivalent to crop_percent(capture_monitor(mon), top_pct, bot_pct) but
+    only the remaining band is grabbed.
+
+    Args:
+        mon (dict): MSS monitor dictionary specifying the monitor to capture.
+        top_pct (int): Percentage of the monitor height to crop from the top (0-100).
+        bot_pct (int): Percentage of the monitor height to crop from the bottom (0-100).
+
+    Returns:
+        PIL.Image.Image: The cropped screenshot.
+    """
+    return capture_region(mon, percent_box(mon['width'], mon['height'], top_pct, bot_pct))
 
 
 def crop_percent(img: Image.Image, top_pct: int, bot_pct: int) -> Image.Image:
@@ -53,19 +301,93 @@ def crop_percent(img: Image.Image, top_pct: int, bot_pct: int) -> Image.Image:
         PIL.Image.Image: The cropped image.
     """
     width, height = img.size
-    top_crop = int(height * top_pct / 100)
-    bot_crop = int(height * bot_pct / 100)
-    cropped_img = img.crop((0, top_crop, width, height - bot_crop))
+    cropped_img = img.crop(percent_box(width, height, top_pct, bot_pct))
     return cropped_img
 
 
-def downscale_max_width(img: Image.Image, max_w: int) -> Image.Image:
+def content_box(img: Image.Image, threshold: int = 24, margin: int = 16, sample_width: int = 480) -> tuple | None:
+    """
+    Finds the bounding box of the non-background content in the image.
+
+    Works on a reduced grayscale copy: the background is taken as the most
+    common gray level, pixels further than `threshold` from it are marked as
+    content, and BOX-resizing the mask to a single column/row gives the row
+    and column projection profiles without a Python loop over pixels.
+
+    Args:
+        img (PIL.Image.Image): The input image.
+        threshold (int): Minimum gray-level distance from the background for
+                         a pixel to count as content (0-255).
+        margin (int): Padding in full-resolution pixels kept around the content.
+        sample_width (int): Approximate width of the reduced copy.
+
+    Returns:
+        tuple | None: (left, top, right, bottom) box in image coordinates, or
+                      None if no content was found.
+    """
+    width, height = img.size
+    factor = max(1, width // sample_width)
+    small = img.reduce(factor) if factor > 1 else img
+    small = small.convert("L")
+    histogram = small.histogram()
+    background = histogram.index(max(histogram))
+    mask = small.point(lambda v: 255 if abs(v - background) > threshold else 0)
+    small_w, small_h = mask.size
+    rows = list(mask.resize((1, small_h), Image.BOX).getdata())
+    cols = list(mask.resize((small_w, 1), Image.BOX).getdata())
+    active_rows = [i for i, v in enumerate(rows) if v]
+    active_cols = [i for i, v in enumerate(cols) if v]
+    if not active_rows or not active_cols:
+        return None
+    left = max(0, active_cols[0] * factor - margin)
+    top = max(0, active_rows[0] * factor - margin)
+    right = min(width, (active_cols[-1] + 1) * factor + margin)
+    bottom = min(height, (active_rows[-1] + 1) * factor + margin)
+    return (left, top, right, bottom)
+
+
+def crop_to_content(img: Image.Image, margin: int = 16) -> Image.Image:
+    """
+    Trims empty margins around the content of the image.
+
+    Args:
+        img (PIL.Image.Image): The input image.
+        margin (int): Padding in pixels kept around the content.
+
+    Returns:
+        PIL.Image.Image: The cropped image, or the input image if no content
+                         was found.
+    """
+    box = content_box(img, margin=margin)
+    if box is None:
+        return img
+    return img.crop(box)
+
+
+RESAMPLE_FILTERS = {
+    "lanczos": Image.LANCZOS,
+    "bicubic": Image.BICUBIC,
+    "hamming": Image.HAMMING,
+    "bilinear": Image.BILINEAR,
+    "box": Image.BOX,
+}
+
+
+def downscale_max_width(img: Image.Image, max_w: int, resample: str = "lanczos", reducing_gap: float | None = 2.0) -> Image.Image:
     """
     Downscales the image to a maximum width while maintaining aspect ratio.
 
+    Large reductions are done in two tiers: an integer box reduce (the same
+    as Image.reduce()) takes the image to within `reducing_gap` times the
+    target size, and only the remaining step runs the selected filter.
+
     Args:
         img (PIL.Image.Image): The input image.
         max_w (int): The maximum width for the image.
+        resample (str): Filter for the final step; one of RESAMPLE_FILTERS.
+        reducing_gap (float | None): How close to the target the integer
+                                     reduce may get; None or 0 resamples the
+                                     full image with the filter in one pass.
 
     Returns:
         PIL.Image.Image: The downscaled image if original width exceeds max_w,
@@ -76,10 +398,41 @@ def downscale_max_width(img: Image.Image, max_w: int) -> Image.Image:
         return img
     aspect_ratio = height / width
     new_height = int(max_w * aspect_ratio)
-    resized_img = img.resize((max_w, new_height), Image.LANCZOS)
+    resized_img = img.resize((max_w, new_height), RESAMPLE_FILTERS.get(resample, Image.LANCZOS),
+                             reducing_gap=reducing_gap or None)
     return resized_img
 
 
+def reduce_colors(img: Image.Image, mode: str = "none", colors: int = 16, autocontrast: bool = False) -> Image.Image:
+    """
+    Shrinks the colour information of a text screenshot before encoding.
+
+    Args:
+        img (PIL.Image.Image): The input image.
+        mode (str): 'none' to keep RGB, 'grayscale' for 8-bit luminance, or
+                    'palette' for an adaptive palette of `colors` entries.
+        colors (int): Palette size for 'palette' mode (2-256).
+        autocontrast (bool): Stretch the histogram so the darkest text maps to
+                             black and the background to white.
+
+    Returns:
+        PIL.Image.Image: The processed image; the input if nothing applies.
+    """
+    if autocontrast:
+        # A small cutoff ignores anti-aliasing fringes and cursor pixels
+        img = ImageOps.autocontrast(img if img.mode in ("L", "RGB") else img.convert("RGB"), cutoff=1)
+    if mode == "grayscale":
+        return img.convert("L")
+    if mode == "palette":
+        if img.mode not in ("L", "RGB"):
+            img = img.convert("RGB")
+        # Dithering scatters noise across flat backgrounds and hurts PNG
+        # compression, so map straight to the nearest palette entry
+        method = Image.Quantize.FASTOCTREE if img.mode == "RGB" else Image.Quantize.MEDIANCUT
+        return img.quantize(colors=max(2, min(256, colors)), method=method, dither=Image.Dither.NONE)
+    return img
+
+
 def encode_png_base64(img: Image.Image) -> str:
     """
     Encodes the image to PNG format and returns it as a base64 data URL.
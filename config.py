@@ -3,7 +3,10 @@ import json
 import platform
 from pathlib import Path
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+import atexit
+import copy
+import queue
 
 DEFAULTS = {
     "api_key": "",
@@ -20,7 +23,62 @@ DEFAULTS = {
     "show_notifications": False,
     "show_confidence_rating": False,
     "pop_dialog_side": "left",
-    "enable_reasoning": False
+    "enable_reasoning": False,
+    "encoder": "png",
+    "encoder_quality": 85,
+    "encoder_max_kb": 0,
+    "preprocess": "none",
+    "palette_colors": 16,
+    "autocontrast": False,
+    "auto_crop": False,
+    "auto_crop_margin": 16,
+    "downscale_filter": "lanczos",
+    "downscale_reducing_gap": 2.0,
+    "cache_enabled": False,
+    "cache_max_distance": 2,
+    "cache_max_entries": 500,
+    "cache_ttl_s": 604800,
+    "api_url": "https://openrouter.ai/api/v1/chat/completions",
+    "keepalive_interval_s": 45,
+    "stream_responses": False,
+    "hedge_enabled": False,
+    "hedge_models": [],
+    "hedge_delay_s": 4.0,
+    "cascade_enabled": False,
+    "cascade_fast_model": "meta-llama/llama-3.2-11b-vision-instruct",
+    "cascade_send_question": True,
+    "cascade_fast_timeout_s": 5.0,
+    "ocr_enabled": False,
+    "ocr_backend": "tesseract",
+    "ocr_tesseract_cmd": "",
+    "ocr_language": "eng",
+    "ocr_min_confidence": 0.85,
+    "ocr_min_chars": 20,
+    "ocr_text_model": "meta-llama/llama-3.1-8b-instruct",
+    "structured_output": True,
+    "reasoning_max_tokens": 4000,
+    "max_tokens_limit": 15000,
+    "request_deadline_s": 20.0,
+    "connect_timeout_s": 3.05,
+    "read_timeout_s": 15.0,
+    "max_retries": 2,
+    "retry_backoff_s": 0.5,
+    "breaker_threshold": 3,
+    "breaker_cooldown_s": 30.0,
+    "press_mode": "latest",
+    "precapture_mode": "off",
+    "precapture_frames": 2,
+    "precapture_interval_s": 0.25,
+    "precapture_max_age_s": 0.75,
+    "precapture_cpu_budget": 0.15,
+    "watch_enabled": False,
+    "watch_interval_s": 0.5,
+    "watch_change_threshold": 8.0,
+    "watch_settle_threshold": 2.0,
+    "watch_settle_samples": 2,
+    "watch_cpu_budget": 0.03,
+    "watch_thumb_width": 64,
+    "debug_logging": False
 }
 
 def get_config_dir():
@@ -56,13 +114,75 @@ def save_config(config: dict) -> None:
     with open(config_path, 'w') as f:
         json.dump(config, f, indent=4)
 
-# Set up logging
-config_dir = get_config_dir()
-config_dir.mkdir(parents=True, exist_ok=True)
-log_path = config_dir / "quizpeek.log"
-handler = RotatingFileHandler(log_path, maxBytes=1024*1024, backupCount=5)
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[handler]
-)
\ No newline at end of file
+class JsonFormatter(logging.Formatter):
+    """Formats each record as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class StructuredQueueHandler(QueueHandler):
+    """
+    QueueHandler that keeps the traceback apart from the message.
+
+    The stock prepare() formats the whole record on the caller's thread,
+    folding any traceback into msg, so formatters behind the listener never
+    see it. This one only merges the arguments into msg and renders the
+    traceback into exc_text, which JsonFormatter writes as its own field and
+    logging.Formatter still appends.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        # Traceback objects hold every frame alive until the listener runs
+        record.exc_info = None
+        return record
+
+def start_queue_listener(*handlers: logging.Handler) -> QueueHandler:
+    """
+    Moves the given handlers onto a background listener thread.
+
+    Returns:
+        QueueHandler: Handler to attach to loggers; it only enqueues records,
+                      so formatting and file I/O never run on the caller's thread.
+    """
+    records = queue.SimpleQueue()
+    listener = QueueListener(records, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return StructuredQueueHandler(records)
+
+def setup_logging(debug: bool = False) -> None:
+    """
+    Configures the root logger: JSON lines to the rotating quizpeek.log in
+    the config dir, written from a queue listener thread. With debug, DEBUG
+    records (including full API payloads) are logged and echoed to stderr.
+    """
+    config_dir = get_config_dir()
+    config_dir.mkdir(parents=True, exist_ok=True)
+    file_handler = RotatingFileHandler(config_dir / "quizpeek.log", maxBytes=1024*1024, backupCount=5)
+    file_handler.setFormatter(JsonFormatter())
+    handlers = [file_handler]
+    if debug:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+        handlers.append(console_handler)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(start_queue_listener(*handlers))
+    root.setLevel(logging.DEBUG if debug else logging.INFO)
@@ -0,0 +1,196 @@
+from PIL import Image
+from abc import ABC, abstractmethod
+import base64
+import logging
+import time
+from io import BytesIO
+
+# Lowest quality the byte-budget search will try for lossy encoders
+MIN_BUDGET_QUALITY = 20
+# Scale step used when the budget cannot be met by lowering quality alone
+BUDGET_SCALE_STEP = 0.85
+MAX_BUDGET_SCALE_STEPS = 6
+
+
+class ImageEncoder(ABC):
+    """Base class for payload encoders. Subclasses implement _save()."""
+
+    name = ''
+    mime = ''
+    lossy = False
+
+    def encode(self, img: Image.Image, quality: int = 85) -> bytes:
+        """
+        Encodes the image to bytes.
+
+        Args:
+            img (PIL.Image.Image): The input image.
+            quality (int): Quality from 1 to 100; ignored by lossless encoders.
+
+        Returns:
+            bytes: The encoded image.
+        """
+        buffer = BytesIO()
+        self._save(img, buffer, quality)
+        return buffer.getvalue()
+
+    @abstractmethod
+    def _save(self, img: Image.Image, buffer: BytesIO, quality: int) -> None:
+        """Writes the image to the buffer in this encoder's format."""
+
+
+class PngEncoder(ImageEncoder):
+    name = 'png'
+    mime = 'image/png'
+    lossy = False
+
+    def _save(self, img, buffer, quality):
+        img.save(buffer, format="PNG")
+
+
+class JpegEncoder(ImageEncoder):
+    name = 'jpeg'
+    mime = 'image/jpeg'
+    lossy = True
+
+    def _save(self, img, buffer, quality):
+        if img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+        img.save(buffer, format="JPEG", quality=quality, optimize=False)
+
+
+class WebpEncoder(ImageEncoder):
+    name = 'webp'
+    mime = 'image/webp'
+    lossy = True
+
+    def _save(self, img, buffer, quality):
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGB')
+        # method 4 is Pillow's default; higher is smaller but much slower
+        img.save(buffer, format="WEBP", quality=quality, method=4)
+
+
+ENCODERS = {
+    PngEncoder.name: PngEncoder(),
+    JpegEncoder.name: JpegEncoder(),
+    WebpEncoder.name: WebpEncoder(),
+}
+
+
+def get_encoder(name: str) -> ImageEncoder:
+    """
+    Looks up an encoder by name, falling back to PNG for unknown names.
+
+    Args:
+        name (str): Encoder name ('png', 'jpeg' or 'webp').
+
+    Returns:
+        ImageEncoder: The registered encoder.
+    """
+    encoder = ENCODERS.get((name or '').lower())
+    if encoder is None:
+        logging.warning("Unknown encoder '%s', using png", name)
+        encoder = ENCODERS['png']
+    return encoder
+
+
+def _timed_encode(encoder: ImageEncoder, img: Image.Image, quality: int) -> tuple[bytes, float]:
+    start = time.perf_counter()
+    data = encoder.encode(img, quality)
+    encode_ms = (time.perf_counter() - start) * 1000
+    logging.debug("%s q=%d %dx%d: %d bytes in %.1f ms", encoder.name, quality, img.width, img.height, len(data), encode_ms)
+    return data, encode_ms
+
+
+def _fit_quality(encoder: ImageEncoder, img: Image.Image, quality: int, budget: int) -> tuple[bytes, int, float, int]:
+    """Binary-searches the highest quality whose output fits the budget."""
+    data, total_ms = _timed_encode(encoder, img, quality)
+    attempts = 1
+    if len(data) <= budget or not encoder.lossy:
+        return data, quality, total_ms, attempts
+    best = None
+    lo, hi = MIN_BUDGET_QUALITY, quality - 1
+    smallest = (data, quality)
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        candidate, encode_ms = _timed_encode(encoder, img, mid)
+        total_ms += encode_ms
+        attempts += 1
+        if len(candidate) <= budget:
+            best = (candidate, mid)
+            lo = mid + 1
+        else:
+            if len(candidate) < len(smallest[0]):
+                smallest = (candidate, mid)
+            hi = mid - 1
+    data, quality = best if best is not None else smallest
+    return data, quality, total_ms, attempts
+
+
+def encode_image(img: Image.Image, name: str = 'png', quality: int = 85, max_kb: int = 0) -> tuple[bytes, dict]:
+    """
+    Encodes the image with the named encoder, optionally searching quality
+    and size so the output fits under max_kb.
+
+    Args:
+        img (PIL.Image.Image): The input image.
+        name (str): Encoder name ('png', 'jpeg' or 'webp').
+        quality (int): Quality for lossy encoders (1-100), and the upper
+                       bound of the budget search.
+        max_kb (int): Byte budget in KiB for the encoded image; 0 disables
+                      the search.
+
+    Returns:
+        tuple: (encoded bytes, stats dict with encoder, mime, quality, size,
+               bytes, encode_ms and attempts).
+    """
+    encoder = get_encoder(name)
+    max_quality = quality
+    budget = max_kb * 1024
+    if budget <= 0:
+        data, encode_ms = _timed_encode(encoder, img, quality)
+        attempts = 1
+    else:
+        data, quality, encode_ms, attempts = _fit_quality(encoder, img, quality, budget)
+        steps = 0
+        # Lowering quality was not enough (or the encoder is lossless), so
+        # shrink the image until it fits
+        while len(data) > budget and steps < MAX_BUDGET_SCALE_STEPS and min(img.size) > 64:
+            img = img.resize((int(img.width * BUDGET_SCALE_STEP), int(img.height * BUDGET_SCALE_STEP)), Image.BILINEAR)
+            data, quality, step_ms, step_attempts = _fit_quality(encoder, img, max_quality, budget)
+            encode_ms += step_ms
+            attempts += step_attempts
+            steps += 1
+        if len(data) > budget:
+            logging.warning("%s payload of %d bytes still exceeds the %s KB budget", encoder.name, len(data), max_kb)
+    stats = {
+        'encoder': encoder.name,
+        'mime': encoder.mime,
+        'quality': quality if encoder.lossy else None,
+        'size': img.size,
+        'bytes': len(data),
+        'encode_ms': encode_ms,
+        'attempts': attempts,
+    }
+    logging.info("Encoded %dx%d as %s (q=%s): %d bytes in %.1f ms over %d attempt(s)",
+                 img.width, img.height, encoder.name, stats['quality'], len(data), encode_ms, attempts)
+    return data, stats
+
+
+def encode_data_url(img: Image.Image, name: str = 'png', quality: int = 85, max_kb: int = 0) -> tuple[str, dict]:
+    """
+    Encodes the image and wraps it in a base64 data URL.
+
+    Args:
+        img (PIL.Image.Image): The input image.
+        name (str): Encoder name ('png', 'jpeg' or 'webp').
+        quality (int): Quality for lossy encoders (1-100).
+        max_kb (int): Byte budget in KiB for the encoded image; 0 disables it.
+
+    Returns:
+        tuple: (data URL string, stats dict from encode_image()).
+    """
+    data, stats = encode_image(img, name, quality, max_kb)
+    img_base64 = base64.b64encode(data).decode('utf-8')
+    return f"data:{stats['mime']};base64,{img_base64}", stats
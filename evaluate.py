@@ -0,0 +1,271 @@
+"""
+Scores models and pipeline settings against a labeled set of screenshots.
+
+Labels are JSONL, one screenshot per line, with the expected answer in the
+same fields the model returns; image paths are relative to the labels file:
+
+    {"image": "q001.png", "mode": "mcq", "answer_indices": [2]}
+    {"image": "q002.png", "mode": "tf", "answer_index": 1}
+    {"image": "q003.png", "mode": "fitb", "answer_text": "Retained earnings"}
+    {"image": "q004.png", "mode": "journal", "answer_entries": ["Cash D 500", "Revenue C 500"]}
+
+Every model is run with every combination of --grid settings (any config key,
+e.g. max_width, top_crop_pct, enable_reasoning, encoder). The report has, per
+combination:
+- accuracy overall and per mode
+- calibration of the returned confidence against correctness (expected
+  calibration error, Brier score and a reliability table)
+- latency percentiles
+- payload size
+- token usage and cost from the API response
+
+With --replay DIR the API traffic goes through a recording store: 'record'
+saves live responses, 'replay' runs fully offline from them, and 'auto'
+replays what it has and records the rest.
+
+Usage:
+    python evaluate.py labels.jsonl --models meta-llama/llama-3.2-90b-vision-instruct,openai/gpt-4o-mini
+        --grid max_width=768,1024 --grid enable_reasoning=false,true
+        [--replay recordings/ --replay-mode auto] [--report report.json] [--details details.jsonl]
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+import metrics
+from batch import answer_file
+from config import load_config
+from replay import REPLAY_MODES, mount_replay
+from router import get_circuit_breaker
+
+MODES = ('mcq', 'tf', 'fitb', 'journal')
+CALIBRATION_BINS = 10
+
+
+def load_labels(path: str) -> list:
+    """Reads the labels file; each item gets an absolute 'path' to its image."""
+    base = os.path.dirname(os.path.abspath(path))
+    labels = []
+    with open(path) as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            label = json.loads(line)
+            if label.get('mode') not in MODES or 'image' not in label:
+                raise ValueError(f"{path}:{line_no}: label needs 'image' and a mode in {MODES}")
+            label['path'] = os.path.join(base, label['image'])
+            labels.append(label)
+    return labels
+
+
+def parse_grid(items: list) -> list:
+    """
+    Expands ['key=v1,v2', ...] into every combination of overrides. Values
+    are read as JSON where possible, so numbers and booleans keep their type.
+    """
+    axes = []
+    for item in items:
+        key, _, values = item.partition('=')
+        parsed = []
+        for value in values.split(','):
+            try:
+                parsed.append(json.loads(value))
+            except ValueError:
+                parsed.append(value)
+        axes.append([(key, value) for value in parsed])
+    return [dict(combo) for combo in itertools.product(*axes)]
+
+
+def _normalize_text(text: str) -> str:
+    text = re.sub(r'\s+', ' ', str(text).casefold()).strip()
+    return text.strip(' .;:!?"\'')
+
+
+def _normalize_entry(entry: str) -> str:
+    entry = _normalize_text(entry).replace('$', '').replace(',', '')
+    entry = re.sub(r'\bdebit\b', 'd', entry)
+    entry = re.sub(r'\bcredit\b', 'c', entry)
+    return re.sub(r'(\d+)\.0+\b', r'\1', entry)
+
+
+def score(label: dict, row: dict) -> float:
+    """
+    Scores one answer against its label.
+
+    Returns:
+        float: 1.0 for a correct answer and 0.0 for a wrong or missing one.
+               Multi-answer mcq and journal answers get partial credit (the
+               F1 of the selected indices or entries).
+    """
+    if row.get('outcome') != 'ok' or row.get('mode') != label['mode']:
+        return 0.0
+    mode = label['mode']
+    if mode == 'tf':
+        return float(row.get('answer_index') == label['answer_index'])
+    if mode == 'fitb':
+        return float(_normalize_text(row.get('answer_text', '')) == _normalize_text(label['answer_text']))
+    if mode == 'mcq':
+        expected = set(label.get('answer_indices', [label.get('answer_index')]))
+        got = set(row.get('answer_indices') or [])
+    else:
+        expected = {_normalize_entry(e) for e in label['answer_entries']}
+        got = {_normalize_entry(e) for e in row.get('answer_entries') or []}
+    if expected == got:
+        return 1.0
+    overlap = len(expected & got)
+    if not overlap:
+        return 0.0
+    precision, recall = overlap / len(got), overlap / len(expected)
+    return 2 * precision * recall / (precision + recall)
+
+
+def calibration(pairs: list, bins: int = CALIBRATION_BINS) -> dict:
+    """
+    Compares stated confidence with correctness.
+
+    Args:
+        pairs (list): (confidence, correct) tuples, correct being 0 or 1.
+
+    Returns:
+        dict: 'ece' (expected calibration error), 'brier' and 'bins', the
+              count, mean confidence and accuracy per confidence bin.
+    """
+    if not pairs:
+        return {'ece': None, 'brier': None, 'bins': []}
+    table = []
+    ece = 0.0
+    for b in range(bins):
+        low, high = b / bins, (b + 1) / bins
+        members = [(c, ok) for c, ok in pairs if low <= c < high or (b == bins - 1 and c == 1.0)]
+        if not members:
+            continue
+        mean_conf = sum(c for c, _ in members) / len(members)
+        accuracy = sum(ok for _, ok in members) / len(members)
+        ece += len(members) / len(pairs) * abs(mean_conf - accuracy)
+        table.append({'range': [low, high], 'count': len(members), 'confidence': mean_conf, 'accuracy': accuracy})
+    brier = sum((c - ok) ** 2 for c, ok in pairs) / len(pairs)
+    return {'ece': ece, 'brier': brier, 'bins': table}
+
+
+def summarize(name: str, overrides: dict, labels: list, rows: list) -> dict:
+    stats = metrics.LatencyStats(window=max(len(rows), 1))
+    scores = [score(label, row) for label, row in zip(labels, rows)]
+    per_mode = {}
+    for mode in MODES:
+        mode_scores = [s for label, s in zip(labels, scores) if label['mode'] == mode]
+        if mode_scores:
+            per_mode[mode] = {'count': len(mode_scores), 'accuracy': sum(mode_scores) / len(mode_scores)}
+    pairs = []
+    for row, s in zip(rows, scores):
+        stats.record({'spans_ms': row['spans_ms']})
+        if row['outcome'] == 'ok' and isinstance(row.get('confidence'), (int, float)):
+            pairs.append((float(row['confidence']), 1.0 if s == 1.0 else 0.0))
+    usages = [row['usage'] for row in rows if isinstance(row.get('usage'), dict)]
+    payloads = [row['payload_bytes'] for row in rows if row.get('payload_bytes')]
+    outcomes = {}
+    for row in rows:
+        outcomes[row['outcome']] = outcomes.get(row['outcome'], 0) + 1
+    return {
+        'name': name,
+        'settings': overrides,
+        'count': len(rows),
+        'accuracy': sum(scores) / len(scores) if scores else 0.0,
+        'per_mode': per_mode,
+        'outcomes': outcomes,
+        'calibration': calibration(pairs),
+        'latency_ms': stats.percentiles('total'),
+        'model_ms': stats.percentiles('model'),
+        'payload_bytes_mean': sum(payloads) / len(payloads) if payloads else None,
+        'tokens': {
+            key: sum(u.get(key) or 0 for u in usages)
+            for key in ('prompt_tokens', 'completion_tokens', 'total_tokens')
+        },
+        'cost': sum(u.get('cost') or 0.0 for u in usages),
+    }
+
+
+def print_table(summaries: list) -> None:
+    print(f"{'combination':<48} {'n':>4} {'acc':>6} " + ' '.join(f"{m:>7}" for m in MODES)
+          + f" {'err':>4} {'p50 ms':>7} {'p95 ms':>7} {'KB':>6} {'tok/q':>7} {'cost':>8} {'ECE':>5}")
+    for s in summaries:
+        modes = ' '.join(f"{s['per_mode'][m]['accuracy']:>7.0%}" if m in s['per_mode'] else f"{'-':>7}" for m in MODES)
+        errors = s['count'] - s['outcomes'].get('ok', 0)
+        latency = s['latency_ms']
+        payload = f"{s['payload_bytes_mean'] / 1024:>6.0f}" if s['payload_bytes_mean'] else f"{'-':>6}"
+        tokens = s['tokens']['total_tokens'] / s['count'] if s['count'] else 0
+        ece = s['calibration']['ece']
+        print(f"{s['name'][:48]:<48} {s['count']:>4} {s['accuracy']:>6.0%} {modes} {errors:>4} "
+              f"{latency.get('p50', 0):>7.0f} {latency.get('p95', 0):>7.0f} {payload} {tokens:>7.0f} "
+              f"{s['cost']:>8.4f} {ece if ece is not None else float('nan'):>5.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('labels', help='labels JSONL file')
+    parser.add_argument('--models', help='comma-separated models; defaults to the configured model')
+    parser.add_argument('--grid', action='append', default=[], help='config key=value1,value2 (repeatable)')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--config', help='JSON file with base config overrides')
+    parser.add_argument('--api-key', default=os.environ.get('OPENROUTER_API_KEY'))
+    parser.add_argument('--replay', help='recording store directory')
+    parser.add_argument('--replay-mode', choices=REPLAY_MODES, default='replay')
+    parser.add_argument('--replay-latency', action='store_true', help='sleep for the recorded response time when replaying')
+    parser.add_argument('--report', help='write the full report as JSON')
+    parser.add_argument('--details', help='write per-screenshot results as JSONL')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    base = load_config()
+    if args.config:
+        with open(args.config) as f:
+            base.update(json.load(f))
+    if args.api_key:
+        base['api_key'] = args.api_key
+    # Each answer must come from the model under test, and one item's
+    # failures must not change how later items or combinations are scored:
+    # no retries, and a breaker that never opens
+    base.update({'cache_enabled': False, 'hedge_enabled': False, 'cascade_enabled': False,
+                 'max_retries': 0, 'breaker_threshold': 10 ** 9})
+    if not base.get('api_key') and args.replay_mode != 'replay':
+        parser.error('no API key: pass --api-key, set OPENROUTER_API_KEY or save one in the app')
+    base.setdefault('api_key', '')
+
+    replay = None
+    if args.replay:
+        replay = mount_replay(args.replay, args.replay_mode, base['api_url'], simulate_latency=args.replay_latency)
+
+    labels = load_labels(args.labels)
+    models = args.models.split(',') if args.models else [base['model']]
+    combinations = [(model, overrides) for model in models for overrides in parse_grid(args.grid)]
+    summaries = []
+    details = open(args.details, 'w') if args.details else None
+    try:
+        for model, overrides in combinations:
+            config = dict(base, model=model, **overrides)
+            get_circuit_breaker(config).reset()
+            name = ' '.join([model] + [f"{k}={v}" for k, v in overrides.items()])
+            print(f"Evaluating {name} on {len(labels)} screenshot(s)", file=sys.stderr)
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                rows = list(pool.map(lambda label: answer_file(label['path'], config), labels))
+            summaries.append(summarize(name, dict(overrides, model=model), labels, rows))
+            if details is not None:
+                for label, row in zip(labels, rows):
+                    details.write(json.dumps({'combination': name, 'label': label, 'score': score(label, row), **row}) + '\n')
+    finally:
+        if details is not None:
+            details.close()
+
+    print_table(summaries)
+    if replay is not None:
+        print(f"replay store: {replay.hits} hit(s), {replay.misses} miss(es)", file=sys.stderr)
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump({'labels': args.labels, 'combinations': summaries}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
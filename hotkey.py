@@ -14,6 +14,7 @@ IS_LINUX = platform.system() == 'Linux'
 
 # Global storage for registered hotkeys
 _registered_hotkeys = {}
+_keydown_hooks = {}
 
 def _normalize_combo(combo: str) -> str:
     """Normalize combo string to canonical format."""
@@ -32,12 +33,12 @@ def _normalize_combo(combo: str) -> str:
 def register(combo: str, callback: callable) -> bool:
     """Register a hotkey combo with callback. Returns True on success."""
     combo = _normalize_combo(combo)
-    logging.info(f"Attempting to register hotkey: {combo}")
+    logging.info("Attempting to register hotkey: %s", combo)
     try:
         if IS_WINDOWS:
             # Use keyboard library on Windows
             keyboard.add_hotkey(combo, callback)
-            logging.info(f"Hotkey {combo} registered successfully on Windows")
+            logging.info("Hotkey %s registered successfully on Windows", combo)
         else:
             # Use pynput on macOS/Linux
             with pynput_keyboard.Listener(on_press=lambda key: _pynput_callback(key, combo, callback)) as listener:
@@ -45,7 +46,7 @@ def register(combo: str, callback: callable) -> bool:
         _registered_hotkeys[combo] = callback
         return True
     except Exception as e:
-        logging.error(f"Failed to register hotkey {combo}: {e}")
+        logging.error("Failed to register hotkey %s: %s", combo, e)
         return False
 
 def unregister(combo: str) -> None:
@@ -60,7 +61,49 @@ def unregister(combo: str) -> None:
                 pass  # For simplicity, assume listener is managed externally
             del _registered_hotkeys[combo]
         except Exception as e:
-            print(f"Failed to unregister hotkey {combo}: {e}")
+            logging.warning("Failed to unregister hotkey %s: %s", combo, e)
+
+def register_keydown(combo: str, callback: callable) -> bool:
+    """
+    Calls callback as soon as the first key of the combo goes down, before
+    the combo itself fires. Auto-repeat while the key is held does not call
+    it again. Returns True on success.
+    """
+    combo = _normalize_combo(combo)
+    first_key = combo.split('+')[0]
+    held = [False]
+
+    def on_press(event):
+        if not held[0]:
+            held[0] = True
+            callback()
+
+    def on_release(event):
+        held[0] = False
+
+    try:
+        if IS_WINDOWS:
+            hooks = (keyboard.on_press_key(first_key, on_press), keyboard.on_release_key(first_key, on_release))
+            _keydown_hooks[combo] = hooks
+            logging.info("Key-down hook for %s registered on %s", combo, first_key)
+            return True
+        # The pynput path has no per-key hooks yet
+        logging.info("Key-down hooks are only supported on Windows")
+        return False
+    except Exception as e:
+        logging.error("Failed to register key-down hook for %s: %s", combo, e)
+        return False
+
+def unregister_keydown(combo: str) -> None:
+    """Removes a hook added by register_keydown()."""
+    combo = _normalize_combo(combo)
+    hooks = _keydown_hooks.pop(combo, None)
+    if hooks is not None:
+        try:
+            for hook in hooks:
+                keyboard.unhook(hook)
+        except Exception as e:
+            logging.warning("Failed to remove key-down hook for %s: %s", combo, e)
 
 def _pynput_callback(key, combo: str, callback: callable):
     """Internal callback for pynput."""
@@ -0,0 +1,220 @@
+import bisect
+import json
+import re
+
+# Python literals some models emit in place of JSON ones
+_LITERALS = {'True': 'true', 'False': 'false', 'None': 'null'}
+_CLOSERS = {'{': '}', '[': ']'}
+# strict=False lets raw newlines and tabs inside strings through
+_decoder = json.JSONDecoder(strict=False)
+# What a well-formed object looks like right after its '{'
+_JSON_START = re.compile(r'\{\s*["}]')
+# Characters the normalizer may scan per character of input
+_SCAN_BUDGET = 4
+
+
+def extract_json(text: str) -> dict | None:
+    """
+    Finds the first non-empty JSON object in a model response.
+
+    Anything outside the object (code fences anywhere, a preamble, trailing
+    notes) is skipped. At each '{' the C decoder is tried first, which
+    handles well-formed JSON in one pass; if it fails, the object is scanned
+    once more and normalized on the way (trailing commas dropped,
+    single-quoted strings and Python True/False/None turned into JSON).
+
+    A candidate that still does not decode is either a stray brace in the
+    prose or a real object that is broken or cut off. The search resumes at
+    the first '{' after the point where decoding failed: a stray brace or
+    apostrophe fails right away, so the answer after it is still found,
+    while a response cut off mid-object fails at its end, so none of its
+    nested objects is returned in its place. The normalizer is capped at
+    _SCAN_BUDGET times the length of the text; past that only the C decoder
+    is tried, so the cost stays linear however many candidates fail.
+
+    Args:
+        text (str): The response content.
+
+    Returns:
+        dict | None: The first object found, or None if there is none (for
+                     example when the response was cut off mid-object).
+    """
+    n = len(text)
+    budget = _SCAN_BUDGET * n
+    too_deep = False
+    start = text.find('{')
+    while start != -1:
+        resume = start + 1
+        if not too_deep and _JSON_START.match(text, start):
+            try:
+                parsed, _ = _decoder.raw_decode(text, start)
+                if parsed:
+                    return parsed
+            except json.JSONDecodeError as e:
+                resume = _resume_after(e, e.pos, n)
+            except RecursionError:
+                # Nested past the recursion limit; every later '{' inside it would be too
+                too_deep = True
+        if budget > 0:
+            end, out, marks = _scan_object(text, start, n)
+            budget -= (end or n) - start
+            candidate = ''.join(out)
+            try:
+                parsed = _decoder.decode(candidate)
+                if parsed:
+                    return parsed
+                resume = end
+            except json.JSONDecodeError as e:
+                resume = _resume_after(e, _source_index(e.pos, out, marks, n), n)
+            except RecursionError:
+                pass
+        start = text.find('{', max(resume, start + 1))
+    return None
+
+
+def _resume_after(error: json.JSONDecodeError, index: int, n: int) -> int:
+    """
+    Picks where to look for the next candidate after a failed decode.
+
+    Returns:
+        int: n if the failure was a string running to the end of the text
+             (everything after it is inside the string), otherwise index,
+             the failure's position in the text.
+    """
+    if error.msg.startswith('Unterminated string'):
+        return n
+    return index
+
+
+def _source_index(pos: int, out: list, marks: list, n: int) -> int:
+    """
+    Maps a position in the normalized candidate back to the text.
+
+    Returns:
+        int: The index in the text of the token containing pos, or n if pos
+             is past the end of the candidate.
+    """
+    offset = 0
+    for piece_index, piece in enumerate(out):
+        offset += len(piece)
+        if offset > pos:
+            break
+    else:
+        return n
+    token = bisect.bisect_right(marks, (piece_index, n)) - 1
+    return marks[token][1] if token >= 0 else n
+
+
+def _scan_object(text: str, start: int, n: int) -> tuple:
+    """
+    Scans the object opening at text[start], normalizing it into JSON.
+
+    Returns:
+        tuple: (end, out, marks): the index after the closing brace (None if
+               the object never closes), the normalized text as a list of
+               pieces, and (piece, index) pairs marking where each token of
+               the text starts in out. Mismatched brackets stop the scan with
+               the bad closer left in place, so decoding fails there.
+    """
+    out = []
+    marks = []
+    stack = []
+    pending_comma = False
+    i = start
+    while i < n:
+        c = text[i]
+        if c == '"' or c == "'":
+            if pending_comma:
+                out.append(',')
+                pending_comma = False
+            marks.append((len(out), i))
+            j = _copy_string(text, i, n, out)
+            if j is None:
+                # Keep the unterminated string so decoding reports it
+                out.append(text[i:])
+                return None, out, marks
+            i = j
+            continue
+        marks.append((len(out), i))
+        if c in '{[':
+            if pending_comma:
+                out.append(',')
+                pending_comma = False
+                marks[-1] = (len(out), i)
+            stack.append(_CLOSERS[c])
+            out.append(c)
+        elif c in '}]':
+            # A comma right before a closer is a trailing comma; drop it
+            pending_comma = False
+            out.append(c)
+            if not stack or stack.pop() != c:
+                return i + 1, out, marks
+            if not stack:
+                return i + 1, out, marks
+        elif c == ',':
+            if pending_comma:
+                out.append(',')
+            pending_comma = True
+        elif c.isspace():
+            out.append(c)
+        else:
+            if pending_comma:
+                out.append(',')
+                pending_comma = False
+                marks[-1] = (len(out), i)
+            if c.isalpha():
+                j = i + 1
+                while j < n and (text[j].isalnum() or text[j] == '_'):
+                    j += 1
+                word = text[i:j]
+                out.append(_LITERALS.get(word, word))
+                i = j
+                continue
+            out.append(c)
+        i += 1
+    return None, out, marks
+
+
+def _copy_string(text: str, i: int, n: int, out: list) -> int | None:
+    """
+    Copies the string literal starting at text[i] to out as a JSON string.
+
+    Returns:
+        int | None: The index after the closing quote, or None if the string
+                    is not terminated.
+    """
+    quote = text[i]
+    if quote == '"':
+        # Fast path: find the closing quote that is not escaped
+        j = i + 1
+        while True:
+            j = text.find('"', j)
+            if j == -1:
+                return None
+            backslashes = 0
+            k = j - 1
+            while text[k] == '\\':
+                backslashes += 1
+                k -= 1
+            if backslashes % 2 == 0:
+                out.append(text[i:j + 1])
+                return j + 1
+            j += 1
+    # Single-quoted: re-quote, escaping double quotes and unescaping \'
+    out.append('"')
+    j = i + 1
+    while j < n:
+        c = text[j]
+        if c == '\\' and j + 1 < n:
+            if text[j + 1] == "'":
+                out.append("'")
+            else:
+                out.append(text[j:j + 2])
+            j += 2
+            continue
+        if c == "'":
+            out.append('"')
+            return j + 1
+        out.append('\\"' if c == '"' else c)
+        j += 1
+    return None
@@ -0,0 +1,241 @@
+import json
+import math
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+from config import get_config_dir, start_queue_listener
+
+# Pipeline stages in the order they run for a press
+STAGES = (
+    'detect', 'grab', 'convert', 'crop', 'downscale', 'cache', 'ocr', 'preprocess', 'encode',
+    'connect', 'upload', 'ttft', 'model', 'parse', 'validate', 'total',
+)
+PERCENTILES = (50, 95, 99)
+
+_local = threading.local()
+
+
+class Trace:
+    """
+    Per-press collection of stage timings, measured with perf_counter_ns.
+
+    A stage that runs more than once for a press (retries, hedged requests)
+    accumulates its time. Safe to add spans from several threads.
+    """
+
+    def __init__(self, press_id=None):
+        self.press_id = press_id
+        self.started_at = time.time()
+        self.started_ns = time.perf_counter_ns()
+        self.spans = {}
+        self.attrs = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str):
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter_ns() - start)
+
+    def add(self, name: str, duration_ns: int) -> None:
+        with self._lock:
+            self.spans[name] = self.spans.get(name, 0) + duration_ns
+
+    def set(self, key: str, value) -> None:
+        with self._lock:
+            self.attrs[key] = value
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter_ns() - self.started_ns) / 1e6
+
+    def to_record(self) -> dict:
+        """Returns the trace as a JSON-serialisable dict with spans in ms."""
+        with self._lock:
+            spans = {name: ns / 1e6 for name, ns in self.spans.items()}
+            attrs = dict(self.attrs)
+        if 'total' not in spans:
+            spans['total'] = self.elapsed_ms()
+        return {'press_id': self.press_id, 'ts': self.started_at, 'spans_ms': spans, **attrs}
+
+
+def current_trace() -> Trace | None:
+    """Returns the trace active on this thread, if any."""
+    return getattr(_local, 'trace', None)
+
+
+@contextmanager
+def tracing(trace: Trace | None):
+    """Makes `trace` the active trace on this thread for the duration of the block."""
+    previous = getattr(_local, 'trace', None)
+    _local.trace = trace
+    try:
+        yield trace
+    finally:
+        _local.trace = previous
+
+
+@contextmanager
+def span(name: str):
+    """Times the block as a span of the trace active on this thread, if any."""
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        add_span(name, time.perf_counter_ns() - start)
+
+
+def bind(fn):
+    """
+    Wraps fn so it runs under the trace active on the calling thread; use it
+    when handing work to an executor, since thread-locals do not follow.
+    """
+    trace = current_trace()
+
+    def run(*args, **kwargs):
+        with tracing(trace):
+            return fn(*args, **kwargs)
+    return run
+
+
+def add_span(name: str, duration_ns: int) -> None:
+    """Adds a span to the trace active on this thread; does nothing without one."""
+    trace = getattr(_local, 'trace', None)
+    if trace is not None:
+        trace.add(name, duration_ns)
+
+
+def nearest_rank(values: list) -> dict:
+    """
+    Returns nearest-rank p50/p95/p99 of the values.
+
+    Returns:
+        dict: {'count': n, 'p50': ms, 'p95': ms, 'p99': ms}; only 'count'
+              when there are no values.
+    """
+    values = sorted(values)
+    summary = {'count': len(values)}
+    if values:
+        for pct in PERCENTILES:
+            rank = max(0, math.ceil(pct / 100 * len(values)) - 1)
+            summary[f'p{pct}'] = values[rank]
+    return summary
+
+
+class LatencyStats:
+    """Rolling per-stage latency windows with percentile summaries."""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._recent = deque(maxlen=window)
+
+    def record(self, record: dict) -> None:
+        """Adds a finished press, as returned by Trace.to_record()."""
+        with self._lock:
+            for name, value in record['spans_ms'].items():
+                samples = self._samples.get(name)
+                if samples is None:
+                    samples = self._samples[name] = deque(maxlen=self.window)
+                samples.append(value)
+            self._recent.append(record)
+
+    def percentiles(self, stage: str) -> dict:
+        """
+        Returns nearest-rank p50/p95/p99 for a stage.
+
+        Returns:
+            dict: {'count': n, 'p50': ms, 'p95': ms, 'p99': ms}; only 'count'
+                  when there are no samples.
+        """
+        with self._lock:
+            values = list(self._samples.get(stage, ()))
+        return nearest_rank(values)
+
+    def snapshot(self) -> dict:
+        """Returns percentile summaries for every stage seen so far."""
+        with self._lock:
+            stages = list(self._samples)
+        ordered = [s for s in STAGES if s in stages] + [s for s in stages if s not in STAGES]
+        return {stage: self.percentiles(stage) for stage in ordered}
+
+    def summary(self, now: float | None = None) -> dict:
+        """
+        Returns the figures shown in the metrics panel.
+
+        Returns:
+            dict: 'total' (end-to-end percentiles of presses answered by a
+                  model, so cache hits and cancelled presses do not flatter
+                  it), 'cached' and 'cancelled' (counts of those presses),
+                  'last' (the latest press record or None), 'cache_hit_rate' (share of cache lookups
+                  that hit, or None), 'text_rate' (share of OCR attempts
+                  answered from text alone, or None), 'payload_bytes' (latest
+                  upload size or None) and 'presses_per_min' (presses in the
+                  last minute).
+        """
+        with self._lock:
+            recent = list(self._recent)
+        now = time.time() if now is None else now
+        looked_up = [r for r in recent if 'cache' in r['spans_ms']]
+        hits = sum(1 for r in looked_up if r.get('outcome') == 'cached')
+        read = [r for r in recent if 'input' in r]
+        payloads = [r['payload_bytes'] for r in recent if 'payload_bytes' in r]
+        return {
+            'total': nearest_rank([r['spans_ms']['total'] for r in recent if r.get('outcome') == 'ok']),
+            'cached': sum(1 for r in recent if r.get('outcome') == 'cached'),
+            'cancelled': sum(1 for r in recent if r.get('outcome') == 'cancelled'),
+            'last': recent[-1] if recent else None,
+            'cache_hit_rate': hits / len(looked_up) if looked_up else None,
+            'text_rate': sum(1 for r in read if r['input'] == 'text') / len(read) if read else None,
+            'payload_bytes': payloads[-1] if payloads else None,
+            'presses_per_min': sum(1 for r in recent if now - r['ts'] <= 60),
+        }
+
+
+_stats = LatencyStats()
+_trace_logger = None
+_trace_logger_lock = threading.Lock()
+
+
+def get_latency_stats() -> LatencyStats:
+    """Returns the process-wide rolling latency stats."""
+    return _stats
+
+
+def _get_trace_logger() -> logging.Logger:
+    global _trace_logger
+    with _trace_logger_lock:
+        if _trace_logger is None:
+            logger = logging.getLogger('quizpeek.traces')
+            logger.propagate = False
+            logger.setLevel(logging.INFO)
+            handler = RotatingFileHandler(get_config_dir() / "traces.jsonl", maxBytes=2 * 1024 * 1024, backupCount=3)
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(start_queue_listener(handler))
+            _trace_logger = logger
+        return _trace_logger
+
+
+def record_trace(trace: Trace) -> dict:
+    """
+    Finishes a press: appends it to traces.jsonl under get_config_dir() and
+    feeds the rolling percentiles.
+
+    Returns:
+        dict: The recorded trace.
+    """
+    record = trace.to_record()
+    _stats.record(record)
+    try:
+        _get_trace_logger().info(json.dumps(record, default=str))
+    except OSError as e:
+        logging.warning("Failed to write trace: %s", e)
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        summary = ', '.join(f"{name} {ms:.1f}" for name, ms in record['spans_ms'].items())
+        logging.debug("Press %s stages (ms): %s", trace.press_id, summary)
+    return record
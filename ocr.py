@@ -0,0 +1,108 @@
+from PIL import Image
+from abc import ABC, abstractmethod
+import logging
+import metrics
+
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+
+class OcrBackend(ABC):
+    """Base class for local OCR backends. Subclasses implement recognize()."""
+
+    name = ''
+
+    def available(self) -> bool:
+        """Returns True if the backend's dependencies are installed."""
+        return True
+
+    @abstractmethod
+    def recognize(self, img: Image.Image, config: dict) -> tuple[str, float]:
+        """
+        Reads the text in an image.
+
+        Args:
+            img (PIL.Image.Image): The prepared (cropped and downscaled) image.
+            config (dict): Application config, for backend options.
+
+        Returns:
+            tuple: (text, confidence), confidence from 0.0 to 1.0.
+        """
+
+
+class TesseractBackend(OcrBackend):
+    name = 'tesseract'
+
+    def available(self):
+        return pytesseract is not None
+
+    def recognize(self, img, config):
+        if config.get('ocr_tesseract_cmd'):
+            pytesseract.pytesseract.tesseract_cmd = config['ocr_tesseract_cmd']
+        data = pytesseract.image_to_data(img.convert('L'), lang=config.get('ocr_language', 'eng'),
+                                         output_type=pytesseract.Output.DICT)
+        lines = {}
+        weighted = 0.0
+        chars = 0
+        for i, word in enumerate(data['text']):
+            word = word.strip()
+            conf = float(data['conf'][i])
+            # Layout rows (blocks, paragraphs, lines) have no text and conf -1
+            if not word or conf < 0:
+                continue
+            key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+            lines.setdefault(key, []).append(word)
+            # Weight by length so a misread long word counts more than a stray mark
+            weighted += conf * len(word)
+            chars += len(word)
+        text = '\n'.join(' '.join(words) for _, words in sorted(lines.items()))
+        return text, (weighted / chars / 100) if chars else 0.0
+
+
+OCR_BACKENDS = {
+    TesseractBackend.name: TesseractBackend(),
+}
+
+
+def get_ocr_backend(name: str) -> OcrBackend | None:
+    """
+    Looks up an OCR backend by name.
+
+    Returns:
+        OcrBackend | None: The backend, or None if the name is unknown or its
+                           dependencies are not installed.
+    """
+    backend = OCR_BACKENDS.get((name or '').lower())
+    if backend is None:
+        logging.warning("Unknown OCR backend '%s'", name)
+        return None
+    if not backend.available():
+        logging.warning("OCR backend %s is not installed", backend.name)
+        return None
+    return backend
+
+
+def run_ocr(img: Image.Image, config: dict) -> dict | None:
+    """
+    Runs the configured OCR backend on a prepared image.
+
+    Returns:
+        dict | None: 'text', 'confidence' and 'backend', or None if no
+                     backend is available or recognition failed.
+    """
+    backend = get_ocr_backend(config.get('ocr_backend', 'tesseract'))
+    if backend is None:
+        return None
+    try:
+        with metrics.span('ocr'):
+            text, confidence = backend.recognize(img, config)
+    except Exception as e:
+        logging.warning("OCR with %s failed: %s", backend.name, e)
+        return None
+    trace = metrics.current_trace()
+    if trace is not None:
+        trace.set('ocr_confidence', round(confidence, 3))
+    logging.debug("OCR read %d chars at confidence %.2f", len(text), confidence)
+    return {'text': text, 'confidence': confidence, 'backend': backend.name}
@@ -1,4 +1,5 @@
 from win10toast import ToastNotifier
+import logging
 
 
 def show_notification(text: str, color: str) -> None:
@@ -14,4 +15,4 @@ def show_notification(text: str, color: str) -> None:
     try:
         toaster.show_toast(title, text, duration=3, threaded=True)
     except Exception as e:
-        print(f"Failed to show notification: {e}")
\ No newline at end of file
+        logging.warning("Failed to show notification: %s", e)
\ No newline at end of file
@@ -0,0 +1,247 @@
+from PIL import Image
+import hashlib
+import json
+import logging
+import metrics
+from capture import detect_monitor_under_mouse, capture_cropped, crop_to_content, downscale_max_width, reduce_colors
+from encoder import encode_data_url
+from answer_cache import dhash, get_answer_cache
+from ocr import run_ocr
+from router import route_request, validate_result, is_confident, Deadline, CancelToken, SYSTEM_PROMPT, USER_PROMPT
+
+# Router error -> error reported to the UI
+ERROR_KINDS = {
+    'cancelled': 'cancelled',
+    'auth': 'auth',
+    'server': 'no_response',
+    'timeout': 'no_response',
+    'network': 'no_response',
+    'rate_limit': 'no_response',
+    'circuit_open': 'circuit_open',
+    'request': 'request_error',
+    'parse': 'parse_error',
+    'truncated': 'parse_error',
+}
+
+
+def cache_variant(config: dict) -> str:
+    """
+    Names the settings an answer depends on besides the image: the model,
+    chain-of-thought, the prompts and every other model that may have
+    answered (the cascade's fast model, the OCR text model, the hedge
+    models). Cached answers are only reused for the same variant, so
+    switching models or routes never returns another model's answers.
+    """
+    settings = [config.get('model'), bool(config.get('enable_reasoning', False)), SYSTEM_PROMPT, USER_PROMPT]
+    if config.get('cascade_enabled', False):
+        settings.append(['cascade', config.get('cascade_fast_model', '')])
+    if config.get('ocr_enabled', False):
+        settings.append(['ocr', config.get('ocr_text_model', '')])
+    if config.get('hedge_enabled', False):
+        settings.append(['hedge', config.get('hedge_models', [])])
+    return hashlib.sha1(json.dumps(settings).encode('utf-8')).hexdigest()[:16]
+
+
+def capture_question(config: dict) -> Image.Image:
+    """
+    Grabs the configured band of the monitor under the mouse.
+
+    Args:
+        config (dict): Application config.
+
+    Returns:
+        PIL.Image.Image: The screenshot with the top and bottom crop applied.
+    """
+    with metrics.span('detect'):
+        mon = detect_monitor_under_mouse()
+    return capture_cropped(mon, config['top_crop_pct'], config['bottom_crop_pct'])
+
+
+def prepare_image(img: Image.Image, config: dict) -> Image.Image:
+    """Applies the optional auto crop and the downscale to a captured band."""
+    if config.get('auto_crop', False):
+        with metrics.span('crop'):
+            img = crop_to_content(img, config.get('auto_crop_margin', 16))
+    with metrics.span('downscale'):
+        return downscale_max_width(img, config['max_width'], config.get('downscale_filter', 'lanczos'),
+                                   config.get('downscale_reducing_gap', 2.0))
+
+
+def encode_payload(img: Image.Image, config: dict) -> tuple:
+    """
+    Preprocesses and encodes a prepared image for upload.
+
+    Returns:
+        tuple: (data_url, encode_stats) as returned by encode_data_url().
+    """
+    with metrics.span('preprocess'):
+        img = reduce_colors(
+            img,
+            config.get('preprocess', 'none'),
+            config.get('palette_colors', 16),
+            config.get('autocontrast', False),
+        )
+    with metrics.span('encode'):
+        data_url, encode_stats = encode_data_url(
+            img,
+            config.get('encoder', 'png'),
+            config.get('encoder_quality', 85),
+            config.get('encoder_max_kb', 0),
+        )
+    trace = metrics.current_trace()
+    if trace is not None:
+        trace.set('payload_bytes', encode_stats['bytes'])
+        trace.set('encoder', encode_stats['encoder'])
+    logging.debug("Encoded %d bytes as %s in %.1f ms", encode_stats['bytes'], encode_stats['encoder'], encode_stats['encode_ms'])
+    return data_url, encode_stats
+
+
+def prepare_payload(img: Image.Image, config: dict, encode: bool = True) -> dict:
+    """
+    Prepares a captured band for answering.
+
+    Args:
+        img (PIL.Image.Image): The captured band.
+        config (dict): Application config.
+        encode (bool): Encode now; otherwise answer_payload() encodes only on
+                       an answer cache miss.
+
+    Returns:
+        dict: 'image' (the prepared image), 'cache_key' (perceptual hash, or
+              None with the cache off), 'data_url' and 'encode_stats' (None
+              until encoded).
+    """
+    img = prepare_image(img, config)
+    payload = {'image': img, 'cache_key': None, 'data_url': None, 'encode_stats': None}
+    if config.get('cache_enabled', False):
+        with metrics.span('cache'):
+            payload['cache_key'] = dhash(img)
+    if encode:
+        payload['data_url'], payload['encode_stats'] = encode_payload(img, config)
+    return payload
+
+
+def answer_from_text(payload: dict, config: dict, deadline: Deadline, cancel: CancelToken | None = None,
+                     route=route_request) -> tuple:
+    """
+    Tries to answer from the text of the prepared image, read by local OCR,
+    with a text-only request.
+
+    Returns:
+        tuple: (result, error) as for answer_payload(), or (None, None) when
+               the image path should be used instead: OCR is unavailable, its
+               confidence is below ocr_min_confidence, too little text was
+               read, the text answer failed, or the model's confidence in it
+               is below confidence_threshold.
+    """
+    ocr = run_ocr(payload['image'], config)
+    if ocr is None:
+        return None, None
+    text = ocr['text'].strip()
+    if ocr['confidence'] < config.get('ocr_min_confidence', 0.85) or len(text) < config.get('ocr_min_chars', 20):
+        logging.info("OCR confidence %.2f over %d chars is too low, sending the image", ocr['confidence'], len(text))
+        return None, None
+    trace = metrics.current_trace()
+    if trace is not None:
+        trace.set('input', 'text')
+        trace.set('payload_bytes', len(text.encode('utf-8')))
+    # A text answer may still be discarded, so it never drives the early display
+    result = route(None, config, deadline, None, cancel, question_text=text)
+    if isinstance(result, dict) and result.get('error') in ('auth', 'cancelled'):
+        return None, result['error']
+    if not isinstance(result, dict) or 'error' in result:
+        logging.info("Text-only request failed (%s), sending the image",
+                     result.get('error') if isinstance(result, dict) else 'no response')
+        return None, None
+    confident = is_confident(result, config)
+    with metrics.span('validate'):
+        valid, msg = validate_result(result)
+    if not valid:
+        logging.info("Text-only answer failed validation (%s), sending the image", msg)
+        return None, None
+    if not confident:
+        logging.info("Text-only answer confidence %s is below the threshold, sending the image", result.get('confidence'))
+        return None, None
+    return result, None
+
+
+def answer_payload(payload: dict, config: dict, deadline: Deadline | float, on_partial=None,
+                   cancel: CancelToken | None = None, route=route_request) -> tuple:
+    """
+    Answers a payload from prepare_payload(): answer cache, the OCR text
+    route when ocr_enabled is set, encode if still needed, route and
+    validate.
+
+    Args:
+        payload (dict): As returned by prepare_payload().
+        config (dict): Application config.
+        deadline (Deadline | float): Press deadline, or a budget in seconds.
+        on_partial (callable): Receives streamed fields as they complete.
+        cancel (CancelToken): Abandons the press when cancelled.
+        route (callable): Called like route_request(), including its
+                          question_text keyword; the Worker passes a wrapper
+                          that keeps the request off its own thread.
+
+    Returns:
+        tuple: (result, error). On success error is None and result is the
+               validated answer (marked 'cached' when served from the answer
+               cache); otherwise result is None and error is one of
+               'cancelled', 'auth', 'no_response', 'circuit_open' (every
+               route's breaker is open, so no model was called),
+               'request_error' (the API rejected the request itself) or
+               'parse_error'.
+    """
+    if not isinstance(deadline, Deadline):
+        deadline = Deadline(deadline)
+    cache_key = payload['cache_key'] if config.get('cache_enabled', False) else None
+    if cache_key is not None:
+        with metrics.span('cache'):
+            cached = get_answer_cache(config).get(cache_key, cache_variant(config))
+        if cached is not None:
+            return cached, None
+    if config.get('ocr_enabled', False):
+        result, error = answer_from_text(payload, config, deadline, cancel, route)
+        if error is not None:
+            return None, error
+        if result is not None:
+            if cache_key is not None:
+                get_answer_cache(config).put(cache_key, result, cache_variant(config))
+            return result, None
+        trace = metrics.current_trace()
+        if trace is not None:
+            trace.set('input', 'image')
+    if payload['data_url'] is None:
+        payload['data_url'], payload['encode_stats'] = encode_payload(payload['image'], config)
+    else:
+        trace = metrics.current_trace()
+        if trace is not None:
+            trace.set('payload_bytes', payload['encode_stats']['bytes'])
+            trace.set('encoder', payload['encode_stats']['encoder'])
+    if cancel is not None and cancel.cancelled:
+        return None, 'cancelled'
+    result = route(payload['data_url'], config, deadline, on_partial, cancel)
+    if not isinstance(result, dict):
+        logging.error("No response from API")
+        return None, 'no_response'
+    if 'error' in result:
+        error = ERROR_KINDS.get(result['error'], 'parse_error')
+        if error != 'cancelled':
+            logging.error("API call failed: %s", result['error'])
+        return None, error
+    with metrics.span('validate'):
+        valid, msg = validate_result(result)
+    if not valid:
+        logging.error("Validation failed for API result: %s", msg)
+        return None, 'parse_error'
+    if cache_key is not None:
+        get_answer_cache(config).put(cache_key, result, cache_variant(config))
+    return result, None
+
+
+def answer_image(img: Image.Image, config: dict, deadline: Deadline | float, on_partial=None,
+                 cancel: CancelToken | None = None, route=route_request) -> tuple:
+    """
+    Runs a captured band through prepare, cache, encode, route and validate.
+    Arguments and return value are as for answer_payload().
+    """
+    return answer_payload(prepare_payload(img, config, encode=False), config, deadline, on_partial, cancel, route)
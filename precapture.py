@@ -0,0 +1,177 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from capture import detect_monitor_under_mouse, capture_cropped, get_capture_session
+from pipeline import prepare_payload
+
+PRECAPTURE_MODES = ('off', 'keydown', 'ring')
+# Config keys that change what prepare_payload() produces
+PAYLOAD_SETTINGS = (
+    'top_crop_pct', 'bottom_crop_pct', 'auto_crop', 'auto_crop_margin', 'max_width', 'downscale_filter',
+    'downscale_reducing_gap', 'preprocess', 'palette_colors', 'autocontrast', 'encoder', 'encoder_quality',
+    'encoder_max_kb', 'cache_enabled',
+)
+
+
+def payload_settings(config: dict) -> tuple:
+    return tuple(repr(config.get(key)) for key in PAYLOAD_SETTINGS)
+
+
+def _frame_bytes(frame: dict) -> int:
+    img = frame['payload']['image']
+    return img.width * img.height * len(img.getbands()) + len(frame['payload']['data_url'] or '')
+
+
+class FrameRing:
+    """
+    Speculatively captured and encoded frames, so a press can skip the local
+    stages.
+
+    In 'keydown' mode capture_async() is called when the first key of the
+    hotkey goes down and the frame is ready (or nearly) by the time the
+    combo completes. In 'ring' mode a background thread keeps the newest
+    `capacity` frames of the monitor under the mouse, capturing no more often
+    than interval_s and backing off so its own CPU time stays under
+    cpu_budget of one core. Frames older than max_age_s are never used.
+    """
+
+    def __init__(self, capacity: int = 2, interval_s: float = 0.25, max_age_s: float = 0.75, cpu_budget: float = 0.15):
+        self.capacity = capacity
+        self.interval_s = interval_s
+        self.max_age_s = max_age_s
+        self.cpu_budget = cpu_budget
+        self._lock = threading.Lock()
+        self._frames = deque(maxlen=capacity)
+        self._pending = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='precapture')
+        self._thread = None
+        self._stop = threading.Event()
+        self._last_capture_at = None
+        self._last_cpu_s = 0.0
+        self._stats = {'frames': 0, 'used': 0, 'stale': 0, 'throttled': 0, 'cpu_ms': 0.0}
+
+    def configure(self, config: dict) -> None:
+        """Applies the precapture_* limits from the config."""
+        with self._lock:
+            capacity = max(1, int(config.get('precapture_frames', 2)))
+            if capacity != self.capacity:
+                self.capacity = capacity
+                self._frames = deque(self._frames, maxlen=capacity)
+            self.interval_s = config.get('precapture_interval_s', 0.25)
+            self.max_age_s = config.get('precapture_max_age_s', 0.75)
+            self.cpu_budget = config.get('precapture_cpu_budget', 0.15)
+
+    def capture(self, config: dict) -> dict:
+        """
+        Captures, prepares and encodes one frame and adds it to the ring.
+
+        Returns:
+            dict: The frame: 'at' (monotonic time), 'monitor', 'settings',
+                  'payload' (from prepare_payload()) and 'cpu_ms'.
+        """
+        cpu_start = time.thread_time()
+        at = time.monotonic()
+        mon = detect_monitor_under_mouse()
+        img = capture_cropped(mon, config['top_crop_pct'], config['bottom_crop_pct'])
+        payload = prepare_payload(img, config)
+        cpu_ms = (time.thread_time() - cpu_start) * 1000
+        frame = {'at': at, 'monitor': dict(mon), 'settings': payload_settings(config), 'payload': payload, 'cpu_ms': cpu_ms}
+        with self._lock:
+            self._last_capture_at = at
+            self._last_cpu_s = cpu_ms / 1000
+            self._frames.append(frame)
+            self._stats['frames'] += 1
+            self._stats['cpu_ms'] += cpu_ms
+        return frame
+
+    def _next_capture_delay(self) -> float:
+        # The interval, stretched until captures stay within the CPU budget
+        return max(self.interval_s, self._last_cpu_s / self.cpu_budget if self.cpu_budget > 0 else 0.0)
+
+    def capture_async(self, config: dict) -> None:
+        """
+        Starts a capture on the precapture thread, unless one is already
+        running or the last one started less than interval_s ago (stretched
+        to keep within cpu_budget, as in the ring), so key-downs for other
+        shortcuts cannot drive captures faster than the ring would.
+        """
+        with self._lock:
+            if self._pending is not None and not self._pending.done():
+                return
+            if self._last_capture_at is not None and time.monotonic() - self._last_capture_at < self._next_capture_delay():
+                self._stats['throttled'] += 1
+                return
+            self._pending = self._executor.submit(self._capture_logged, dict(config))
+
+    def _capture_logged(self, config: dict):
+        try:
+            return self.capture(config)
+        except Exception as e:
+            logging.warning("Speculative capture failed: %s", e)
+            return None
+
+    def take(self, config: dict) -> dict | None:
+        """
+        Returns the payload of the newest usable frame, or None. A capture
+        still in flight is waited for, since it started before the press.
+        A frame is usable if it is younger than max_age_s, was prepared with
+        the same settings and shows the monitor now under the mouse.
+        """
+        with self._lock:
+            pending = self._pending
+        if pending is not None and not pending.done():
+            pending.result()
+        settings = payload_settings(config)
+        mon = detect_monitor_under_mouse()
+        now = time.monotonic()
+        with self._lock:
+            while self._frames:
+                frame = self._frames.pop()
+                if now - frame['at'] <= self.max_age_s and frame['settings'] == settings and frame['monitor'] == dict(mon):
+                    self._stats['used'] += 1
+                    # A frame answers at most one press
+                    self._frames.clear()
+                    return frame['payload']
+                self._stats['stale'] += 1
+        return None
+
+    def start(self, config: dict) -> None:
+        """Starts the background ring; it keeps its own snapshot of the config."""
+        self.configure(config)
+        if self._thread is not None and self._thread.is_alive():
+            return
+        # Each run gets its own stop event, so a loop still finishing a
+        # capture after stop() cannot be revived by a quick restart
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._ring_loop, args=(dict(config), self._stop), name='precapture-ring',
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops the background ring and drops the buffered frames."""
+        self._stop.set()
+        self._thread = None
+        with self._lock:
+            self._frames.clear()
+
+    def _ring_loop(self, config: dict, stop: threading.Event):
+        logging.info("Pre-capture ring started")
+        while not stop.is_set():
+            self._capture_logged(config)
+            stop.wait(self._next_capture_delay())
+        get_capture_session().release()
+        logging.info("Pre-capture ring stopped")
+
+    def stats(self) -> dict:
+        """
+        Returns counters for the metrics panel: frames captured, used and
+        discarded as stale, key-downs skipped by the rate limit, mean CPU ms
+        per frame and bytes currently held.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['held_bytes'] = sum(_frame_bytes(frame) for frame in self._frames)
+        stats['cpu_ms_per_frame'] = stats['cpu_ms'] / stats['frames'] if stats['frames'] else 0.0
+        return stats
@@ -0,0 +1,146 @@
+import base64
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+from datetime import timedelta
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from router import API_URL, get_http_session, rejects_structured_output
+
+REPLAY_MODES = ('replay', 'record', 'auto')
+# The recorded body is stored decoded and whole
+_DROPPED_HEADERS = ('content-encoding', 'transfer-encoding', 'content-length', 'connection')
+
+
+class ReplayAdapter(BaseAdapter):
+    """
+    Transport adapter that answers API requests from a directory of recorded
+    responses, keyed by a hash of the request body (model, prompt and image).
+
+    In 'replay' mode the network is never touched and a request without a
+    recording fails like a connection error. 'record' forwards every request
+    to the live adapter and saves the response; 'auto' replays what it has
+    and records the rest. Only successes are recorded, plus the error a model
+    returns when it rejects structured output, so a replayed run falls back
+    to the plain prompt like the recorded one did.
+    """
+
+    def __init__(self, directory: str, mode: str = 'replay', live: BaseAdapter | None = None, simulate_latency: bool = False):
+        """
+        Args:
+            directory (str): Where recordings are stored, one JSON file each.
+            mode (str): One of REPLAY_MODES.
+            live (BaseAdapter): Adapter used for requests that go to the network.
+            simulate_latency (bool): Sleep for the recorded response time when
+                                     replaying, so latency figures stay realistic.
+        """
+        super().__init__()
+        if mode not in REPLAY_MODES:
+            raise ValueError(f"Unknown replay mode: {mode}")
+        if mode != 'replay' and live is None:
+            raise ValueError(f"Replay mode {mode} needs a live adapter")
+        self.directory = directory
+        self.mode = mode
+        self.live = live
+        self.simulate_latency = simulate_latency
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, request) -> str:
+        body = request.body or b''
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        return os.path.join(self.directory, f"{hashlib.sha256(body).hexdigest()}.json")
+
+    def _load(self, path: str) -> dict | None:
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.warning("Ignoring unreadable recording %s: %s", path, e)
+            return None
+
+    def _save(self, path: str, response) -> None:
+        entry = {
+            'url': response.url,
+            'status': response.status_code,
+            'reason': response.reason,
+            'headers': {k: v for k, v in response.headers.items() if k.lower() not in _DROPPED_HEADERS},
+            'body_b64': base64.b64encode(response.content).decode('ascii'),
+            'elapsed_ms': response.elapsed.total_seconds() * 1000,
+            'recorded_at': time.time(),
+        }
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning("Failed to save recording %s: %s", path, e)
+
+    def _build_response(self, request, entry: dict):
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.reason = entry.get('reason')
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = io.BytesIO(base64.b64decode(entry['body_b64']))
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.elapsed = timedelta(milliseconds=entry.get('elapsed_ms', 0.0))
+        return response
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        path = self._path(request)
+        if self.mode != 'record':
+            entry = self._load(path)
+            if entry is not None:
+                with self._lock:
+                    self.hits += 1
+                if self.simulate_latency:
+                    time.sleep(entry.get('elapsed_ms', 0.0) / 1000)
+                return self._build_response(request, entry)
+            with self._lock:
+                self.misses += 1
+            if self.mode == 'replay':
+                raise requests.exceptions.ConnectionError(f"No recorded response in {self.directory} for this request",
+                                                          request=request)
+        # Read the whole body so it can be saved; a streamed caller then
+        # iterates over the buffered content
+        response = self.live.send(request, stream=False, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+        # Only successes are kept; a replayed 401 or 400 would fail every
+        # later run, even after the key or request is fixed. A rejected
+        # response_format is a property of the model, so it is kept too.
+        if 200 <= response.status_code < 300 or rejects_structured_output(response):
+            self._save(path, response)
+        return response
+
+    def close(self):
+        if self.live is not None:
+            self.live.close()
+
+
+def mount_replay(directory: str, mode: str = 'replay', api_url: str = API_URL, session: requests.Session | None = None,
+                 simulate_latency: bool = False) -> ReplayAdapter:
+    """
+    Routes requests for api_url on the session (the shared API session by
+    default) through a ReplayAdapter backed by the session's current adapter.
+
+    Returns:
+        ReplayAdapter: The mounted adapter, for its hit and miss counts.
+    """
+    session = session or get_http_session()
+    adapter = ReplayAdapter(directory, mode, session.get_adapter(api_url), simulate_latency)
+    session.mount(api_url, adapter)
+    return adapter
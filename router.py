@@ -1,22 +1,322 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
 import json
 import re
 import logging
+import threading
+import time
+import random
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from streaming import PartialJSONParser, iter_sse_data
+from json_extract import extract_json
+import metrics
 
-def call_openrouter(image_data_url: str, model: str, api_key: str, enable_reasoning: bool = False, timeout_s: float = 2.0) -> dict | None:
-    system_prompt = 'You are a quiz parser. Input is a cropped screenshot of a quiz. Return ONLY strict JSON. If multiple questions are visible, answer the TOPMOST one.'
+API_URL = 'https://openrouter.ai/api/v1/chat/completions'
+
+SYSTEM_PROMPT = 'You are a quiz parser. Input is a cropped screenshot of a quiz. Return ONLY strict JSON. If multiple questions are visible, answer the TOPMOST one.'
+USER_PROMPT = '''Extract the question and answers and decide the correct answer(s). If it's multiple-choice, return "mode":"mcq" and "answer_indices" as a list of 0-based indices (even for single answer). Do not use "answer_index" for multiple-choice questions. If it's true/false, return 'mode':'tf' and 'answer_index' as 0 for True or 1 for False. If it's fill-in, return "mode":"fitb" and "answer_text". If it's an accounting journal entry question (scenario at top, outline in middle, journal entry at bottom), return "mode":"journal" and "answer_entries" as an array of strings in format "Account D/C Amount". Focus ONLY on the journal entry part at the bottom. If negation words like NOT/EXCEPT/LEAST appear, still pick the correct answer(s). JSON schema: {"mode": "mcq|fitb|journal|tf", "question": "string", "choices": ["string"], "answer_indices": [0], "answer_index": 0, "answer_text": "string", "answer_entries": ["string"], "confidence": 0.0}. Always include a 'confidence' field as a float from 0.0 to 1.0 estimating your confidence in the answer based on your reasoning. Output ONLY JSON.'''
+
+# Output token caps per answer mode; the answer echoes the question and choices.
+# A max_tokens_by_mode dict in config.json overrides them.
+MODE_MAX_TOKENS = {'tf': 300, 'mcq': 600, 'fitb': 400, 'journal': 900}
+# JSON schema sent as response_format to models that support structured output
+ANSWER_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'mode': {'type': 'string', 'enum': ['mcq', 'fitb', 'journal', 'tf']},
+        'question': {'type': 'string'},
+        'choices': {'type': 'array', 'items': {'type': 'string'}},
+        'answer_indices': {'type': 'array', 'items': {'type': 'integer'}},
+        'answer_index': {'type': 'integer'},
+        'answer_text': {'type': 'string'},
+        'answer_entries': {'type': 'array', 'items': {'type': 'string'}},
+        'confidence': {'type': 'number'},
+    },
+    'required': ['mode', 'question', 'confidence'],
+    'additionalProperties': False,
+}
+
+_http_session = None
+_http_session_lock = threading.Lock()
+_last_used = 0.0
+_keepalive_thread = None
+_keepalive_stop = threading.Event()
+_EXECUTOR_WORKERS = 8
+_executor = ThreadPoolExecutor(max_workers=_EXECUTOR_WORKERS, thread_name_prefix='openrouter')
+# Futures submitted to _executor that have not finished, cancelled ones
+# still waiting for headers included
+_executor_pending = set()
+_executor_pending_lock = threading.Lock()
+# Models that rejected response_format; they get the free-text prompt only
+_unstructured_models = set()
+
+
+class _TimedConnectionMixin:
+    """Reports connection setup and request upload time to the active trace."""
+
+    def connect(self):
+        start = time.perf_counter_ns()
+        try:
+            return super().connect()
+        finally:
+            elapsed = time.perf_counter_ns() - start
+            self._connect_ns = getattr(self, '_connect_ns', 0) + elapsed
+            metrics.add_span('connect', elapsed)
+
+    def request(self, *args, **kwargs):
+        # Plain HTTP connects lazily inside request(); keep that out of the
+        # upload figure
+        self._connect_ns = 0
+        start = time.perf_counter_ns()
+        try:
+            return super().request(*args, **kwargs)
+        finally:
+            metrics.add_span('upload', time.perf_counter_ns() - start - self._connect_ns)
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections record 'connect' and 'upload' spans."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool,
+        }
+
+
+def get_http_session() -> requests.Session:
+    """Returns the shared keep-alive session used for all OpenRouter calls."""
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            # A few pooled connections are enough for hedged/batch requests;
+            # retries are handled by the caller, not urllib3
+            adapter = TimedHTTPAdapter(pool_connections=2, pool_maxsize=8, max_retries=0)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _http_session = session
+        return _http_session
+
+
+def prewarm(api_url: str = API_URL, session: requests.Session | None = None, timeout_s: float = 5.0) -> float | None:
+    """
+    Opens (or refreshes) a pooled connection to the API host so the next
+    call skips DNS, TCP and the TLS handshake.
+
+    Returns:
+        float | None: Time to first byte in ms, or None if the host could not
+                      be reached.
+    """
+    global _last_used
+    session = session or get_http_session()
+    start = time.perf_counter()
+    try:
+        # Any status is fine; only the connection matters
+        response = session.head(api_url, timeout=timeout_s)
+        response.close()
+    except requests.exceptions.RequestException as e:
+        logging.warning("Connection pre-warm to %s failed: %s", api_url, e)
+        return None
+    _last_used = time.monotonic()
+    ttfb_ms = (time.perf_counter() - start) * 1000
+    logging.info("Pre-warmed connection to %s in %.0f ms", api_url, ttfb_ms)
+    return ttfb_ms
+
+
+def _keepalive_loop(api_url: str, interval_s: float, stop: threading.Event):
+    prewarm(api_url)
+    while not stop.wait(min(interval_s, 5.0)):
+        # Servers drop idle keep-alive connections after a minute or so;
+        # touch the pool before that happens so a press never pays a reconnect
+        if time.monotonic() - _last_used >= interval_s:
+            prewarm(api_url)
+
+
+def start_keepalive(api_url: str = API_URL, interval_s: float = 45.0) -> None:
+    """Pre-warms the API connection in the background and keeps it fresh until stop_keepalive()."""
+    global _keepalive_thread, _keepalive_stop
+    if _keepalive_thread is not None and _keepalive_thread.is_alive():
+        return
+    # Each run gets its own stop event, so a loop still inside prewarm()
+    # after stop_keepalive() cannot be revived by a quick restart
+    _keepalive_stop = threading.Event()
+    _keepalive_thread = threading.Thread(target=_keepalive_loop, args=(api_url, interval_s, _keepalive_stop),
+                                         name='openrouter-keepalive', daemon=True)
+    _keepalive_thread.start()
+
+
+def stop_keepalive() -> None:
+    """Stops the background connection refresh started by start_keepalive()."""
+    global _keepalive_thread
+    _keepalive_stop.set()
+    _keepalive_thread = None
+
+
+class CancelToken:
+    """
+    Lets another thread abandon an in-flight call_openrouter(). Cancelling
+    closes any response attached to the token, which aborts a streamed body
+    mid-read; a call still waiting for headers returns 'cancelled' as soon as
+    they arrive.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._responses = set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        self._event.set()
+        with self._lock:
+            responses, self._responses = self._responses, set()
+        for response in responses:
+            try:
+                response.close()
+            except Exception:
+                pass
+
+    def wait(self, timeout_s: float) -> bool:
+        """Sleeps up to timeout_s; returns True early if the token is cancelled."""
+        return self._event.wait(timeout_s)
+
+    def attach(self, response) -> None:
+        with self._lock:
+            if not self._event.is_set():
+                self._responses.add(response)
+                return
+        response.close()
+
+    def detach(self, response) -> None:
+        with self._lock:
+            self._responses.discard(response)
+
+
+def _read_stream(response, on_partial=None, cancel: CancelToken | None = None, started_ns: int | None = None,
+                 deadline=None) -> tuple:
+    """
+    Collects the content deltas of a streamed completion, calling on_partial
+    with the decoded fields whenever new ones complete once the answer is in.
+    The first delta is recorded as the 'ttft' span, measured from started_ns.
+
+    The read timeout applies per socket read, so a stream that keeps sending
+    chunks or keep-alive comments would never time out on its own; when the
+    press Deadline passes the response is closed and ReadTimeout raised.
+
+    Returns:
+        tuple: (content, usage, finish_reason). content is None if the stream
+               reported an error; usage is the token accounting from the final
+               chunk, if any.
+    """
+    parser = PartialJSONParser()
+    parts = []
+    usage = None
+    finish_reason = None
+    timed_out = [False]
+
+    def should_stop():
+        # Checked on every line, so keep-alive comments cannot hold the stream open
+        timed_out[0] = deadline is not None and deadline.expired
+        return timed_out[0]
+
+    for data in iter_sse_data(response, should_stop):
+        if cancel is not None and cancel.cancelled:
+            return None, usage, finish_reason
+        try:
+            event = json.loads(data)
+        except ValueError:
+            continue
+        if 'error' in event:
+            logging.error("Stream error: %s", event['error'])
+            return None, usage, finish_reason
+        if event.get('usage'):
+            usage = event['usage']
+        choices = event.get('choices') or []
+        if not choices:
+            continue
+        finish_reason = choices[0].get('finish_reason') or finish_reason
+        delta = (choices[0].get('delta') or {}).get('content') or ''
+        if not delta:
+            continue
+        if not parts and started_ns is not None:
+            metrics.add_span('ttft', time.perf_counter_ns() - started_ns)
+        parts.append(delta)
+        completed = parser.feed(delta)
+        if on_partial is not None and completed and parser.has_answer():
+            on_partial(dict(parser.fields))
+    if timed_out[0]:
+        response.close()
+        raise requests.exceptions.ReadTimeout("Press deadline passed while streaming")
+    return ''.join(parts), usage, finish_reason
+
+
+def call_openrouter(image_data_url: str, model: str, api_key: str, enable_reasoning: bool = False, timeout_s: float | tuple = 2.0,
+                    session: requests.Session | None = None, api_url: str = API_URL,
+                    stream: bool = False, on_partial=None, cancel: CancelToken | None = None, hint: str | None = None,
+                    question_text: str | None = None, max_tokens: int = 15000, structured: bool = False,
+                    deadline=None) -> dict | None:
+    """
+    Asks one model for the answer to a screenshot, or to its OCR text.
+
+    Args:
+        max_tokens (int): Output token cap; see output_token_cap().
+        structured (bool): Request ANSWER_SCHEMA as a response_format.
+        deadline (Deadline): Ends a streamed response once it passes.
+
+    Returns:
+        dict | None: The parsed answer with 'raw_answer_text' (and 'usage'
+                     when reported), or {'error': kind}. Besides the transport
+                     errors, kind is 'truncated' when the cap cut the answer
+                     short, 'unsupported' when the model rejected the
+                     structured output request and 'request' for any other
+                     4xx (bad payload, no credits, unknown model), which a
+                     retry would not fix.
+    """
+    system_prompt = SYSTEM_PROMPT
     if enable_reasoning and is_model_supported(model):
         system_prompt += " Use chain-of-thought: think step by step before outputting JSON."
     if enable_reasoning and not is_model_supported(model):
-        logging.info(f"Reasoning requested but ignored for unsupported model: {model}")
-    user_text = '''Extract the question and answers and decide the correct answer(s). If it's multiple-choice, return "mode":"mcq" and "answer_indices" as a list of 0-based indices (even for single answer). Do not use "answer_index" for multiple-choice questions. If it's true/false, return 'mode':'tf' and 'answer_index' as 0 for True or 1 for False. If it's fill-in, return "mode":"fitb" and "answer_text". If it's an accounting journal entry question (scenario at top, outline in middle, journal entry at bottom), return "mode":"journal" and "answer_entries" as an array of strings in format "Account D/C Amount". Focus ONLY on the journal entry part at the bottom. If negation words like NOT/EXCEPT/LEAST appear, still pick the correct answer(s). JSON schema: {"mode": "mcq|fitb|journal|tf", "question": "string", "choices": ["string"], "answer_indices": [0], "answer_index": 0, "answer_text": "string", "answer_entries": ["string"], "confidence": 0.0}. Always include a 'confidence' field as a float from 0.0 to 1.0 estimating your confidence in the answer based on your reasoning. Output ONLY JSON.'''
+        logging.info("Reasoning requested but ignored for unsupported model: %s", model)
+    user_text = USER_PROMPT
     
-    messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": [
+    if hint:
+        user_text += f" A faster model already read this screenshot; use its reading only as a hint and check it against the image: {hint}"
+
+    if question_text is not None:
+        # Text-only request: the screenshot was read locally by OCR
+        user_content = (user_text + " The screenshot has been read by OCR and only its text is given; expect small"
+                        " recognition errors. Screenshot text:\n" + question_text)
+    else:
+        user_content = [
             {"type": "text", "text": user_text},
             {"type": "image_url", "image_url": {"url": image_data_url}}
-        ]}
+        ]
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_content}
     ]
     
     headers = {
@@ -29,52 +329,555 @@ def call_openrouter(image_data_url: str, model: str, api_key: str, enable_reason
         'model': model,
         'messages': messages,
         'temperature': 0.0,
-        'max_tokens': 15000
+        'max_tokens': max_tokens,
+        # Adds token counts and cost to the response
+        'usage': {'include': True}
     }
+    if structured:
+        data['response_format'] = {
+            'type': 'json_schema',
+            'json_schema': {'name': 'quiz_answer', 'strict': False, 'schema': ANSWER_SCHEMA},
+        }
+    if stream:
+        data['stream'] = True
     
+    global _last_used
+    session = session or get_http_session()
+    if cancel is not None and cancel.cancelled:
+        return {'error': 'cancelled'}
+    response = None
+    usage = None
+    finish_reason = None
+    started_ns = time.perf_counter_ns()
     try:
-        response = requests.post('https://openrouter.ai/api/v1/chat/completions', headers=headers, json=data, timeout=timeout_s)
-        print(f"API response status: {response.status_code}")
+        response = session.post(api_url, headers=headers, json=data, timeout=timeout_s, stream=stream)
+        _last_used = time.monotonic()
+        if cancel is not None:
+            cancel.attach(response)
+            if cancel.cancelled:
+                return {'error': 'cancelled'}
+        logging.debug("API responded %s after %.0f ms", response.status_code, response.elapsed.total_seconds() * 1000)
         if response.status_code in [401, 403]:
             return {'error': 'auth'}  # Authentication error
         if response.status_code >= 500:
             return {'error': 'server'}  # Server error
+        if response.status_code == 429:
+            return {'error': 'rate_limit'}
+        if structured and rejects_structured_output(response):
+            logging.info("%s rejected the structured output request (%s)", model, response.status_code)
+            return {'error': 'unsupported'}
+        if 400 <= response.status_code < 500:
+            logging.error("%s rejected the request (%s): %s", model, response.status_code, response.text[:200])
+            return {'error': 'request'}
         response.raise_for_status()
-        result = response.json()
-        print(f"Full API result: {result}")
-        if 'choices' not in result or not result['choices']:
-            print("No choices in result")
-            return {'error': 'parse'}
-        content = result['choices'][0]['message']['content']
-        print(f"API response content: '{content}'")
-        if not content.strip():
-            print("Content is empty")
-            return {'error': 'parse'}
-        # Strip markdown code blocks
-        if content.strip().startswith('```json'):
-            content = content.strip()[7:]  # Remove ```json
-            if content.endswith('```'):
-                content = content[:-3]  # Remove ```
-            content = content.strip()
-        elif content.strip().startswith('```'):
-            content = content.strip()[3:]  # Remove ```
-            if content.endswith('```'):
-                content = content[:-3]
-            content = content.strip()
-        print(f"Cleaned content: '{content}'")
+        if stream:
+            content, usage, finish_reason = _read_stream(response, on_partial, cancel, started_ns, deadline)
+            if cancel is not None and cancel.cancelled:
+                return {'error': 'cancelled'}
+            if content is None:
+                return {'error': 'server'}
+        else:
+            metrics.add_span('ttft', int(response.elapsed.total_seconds() * 1e9))
+            result = response.json()
+            logging.debug("Full API result: %s", result)
+            if 'choices' not in result or not result['choices']:
+                logging.error("No choices in API result")
+                return {'error': 'parse'}
+            usage = result.get('usage')
+            finish_reason = result['choices'][0].get('finish_reason')
+            content = result['choices'][0]['message']['content']
+        metrics.add_span('model', time.perf_counter_ns() - started_ns)
+        parse_started_ns = time.perf_counter_ns()
+        logging.debug("API response content: %r", content)
         try:
-            parsed = json.loads(content)
-            parsed['raw_answer_text'] = content
+            parsed = extract_json(content)
+            if parsed is None:
+                if finish_reason == 'length':
+                    logging.warning("Answer from %s was cut off at %d tokens", model, max_tokens)
+                    return {'error': 'truncated'}
+                logging.error("No JSON object in API response" if content.strip() else "API response content is empty")
+                return {'error': 'parse'}
+            parsed['raw_answer_text'] = content.strip()
+            if usage:
+                parsed['usage'] = usage
             return parsed
-        except json.JSONDecodeError as e:
-            print(f"JSON decode error: {e}")
-            return {'error': 'parse'}
+        finally:
+            metrics.add_span('parse', time.perf_counter_ns() - parse_started_ns)
     except requests.exceptions.Timeout:
-        print("API timeout")
+        logging.warning("API timeout calling %s", model)
         return {'error': 'timeout'}
     except requests.exceptions.RequestException as e:
-        print(f"API network error: {e}")
+        if cancel is not None and cancel.cancelled:
+            return {'error': 'cancelled'}
+        logging.warning("API network error: %s", e)
         return {'error': 'network'}
+    except Exception:
+        # Closing the response from another thread can surface as almost any
+        # error inside urllib3
+        if cancel is not None and cancel.cancelled:
+            return {'error': 'cancelled'}
+        raise
+    finally:
+        if cancel is not None and response is not None:
+            cancel.detach(response)
+
+
+RETRYABLE_ERRORS = ('timeout', 'server', 'network', 'rate_limit')
+
+
+def rejects_structured_output(response) -> bool:
+    """
+    Returns True if an error response says the model does not support the
+    response_format parameter. Only an error that names the parameter
+    counts; a 400 for an oversized image must not disable structured output.
+    """
+    return (response.status_code in (400, 404, 422)
+            and re.search(r'response_format|json_schema', response.text, re.IGNORECASE) is not None)
+
+
+def output_token_cap(config: dict, mode: str | None = None, reasoning: bool = False) -> int:
+    """
+    Returns the max_tokens to request.
+
+    Args:
+        config (dict): Application config; max_tokens_by_mode overrides
+                       MODE_MAX_TOKENS.
+        mode (str | None): The expected answer mode, if already known (e.g.
+                           from the fast model of a cascade); otherwise the
+                           largest per-mode cap is used.
+        reasoning (bool): Add reasoning_max_tokens for the chain of thought.
+
+    Returns:
+        int: The cap, at most max_tokens_limit.
+    """
+    caps = config.get('max_tokens_by_mode') or MODE_MAX_TOKENS
+    cap = caps[mode] if mode in caps else max(caps.values())
+    if reasoning:
+        cap += config.get('reasoning_max_tokens', 4000)
+    return min(cap, config.get('max_tokens_limit', 15000))
+
+
+class Deadline:
+    """End-to-end time budget for one hotkey press, measured on the monotonic clock."""
+
+    def __init__(self, budget_s: float):
+        self.budget_s = budget_s
+        self.expires_at = time.monotonic() + budget_s
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def timeout(self, connect_s: float, read_s: float) -> tuple:
+        """Returns a requests (connect, read) timeout clipped to the remaining budget."""
+        remaining = max(0.1, self.remaining())
+        return (min(connect_s, remaining), min(read_s, remaining))
+
+
+class CircuitBreaker:
+    """
+    Per-model breaker: after `threshold` consecutive route failures the model
+    is skipped for `cooldown_s`, then a single trial request is let through.
+    """
+
+    def __init__(self, threshold: int = 3, cooldown_s: float = 30.0):
+        self.threshold = threshold
+        self.cooldown_s = cooldown_s
+        self._lock = threading.Lock()
+        self._failures = {}
+        self._opened_at = {}
+
+    def is_open(self, model: str) -> bool:
+        """True while the model is cooling down; does not consume the half-open trial."""
+        with self._lock:
+            opened_at = self._opened_at.get(model)
+            return opened_at is not None and time.monotonic() - opened_at < self.cooldown_s
+
+    def allow(self, model: str) -> bool:
+        with self._lock:
+            opened_at = self._opened_at.get(model)
+            if opened_at is None:
+                return True
+            if time.monotonic() - opened_at >= self.cooldown_s:
+                # Half-open: let one request probe the route
+                self._opened_at[model] = time.monotonic()
+                return True
+            return False
+
+    def record_success(self, model: str) -> None:
+        with self._lock:
+            self._failures.pop(model, None)
+            if self._opened_at.pop(model, None) is not None:
+                logging.info("Circuit closed for %s", model)
+
+    def record_failure(self, model: str) -> None:
+        with self._lock:
+            failures = self._failures.get(model, 0) + 1
+            self._failures[model] = failures
+            if failures >= self.threshold:
+                if model not in self._opened_at:
+                    logging.warning("Circuit opened for %s after %d consecutive failures", model, failures)
+                self._opened_at[model] = time.monotonic()
+
+    def reset(self) -> None:
+        """Closes every circuit and forgets the failure counts."""
+        with self._lock:
+            self._failures.clear()
+            self._opened_at.clear()
+
+
+_breaker = CircuitBreaker()
+
+
+def get_circuit_breaker(config: dict) -> CircuitBreaker:
+    """Returns the shared circuit breaker with the limits from the config applied."""
+    _breaker.threshold = config.get('breaker_threshold', 3)
+    _breaker.cooldown_s = config.get('breaker_cooldown_s', 30.0)
+    return _breaker
+
+
+def call_with_retries(image_data_url: str, model: str, config: dict, deadline: Deadline, on_partial=None,
+                      cancel: CancelToken | None = None, hint: str | None = None, stream: bool | None = None,
+                      enable_reasoning: bool | None = None, question_text: str | None = None,
+                      mode: str | None = None) -> dict | None:
+    """
+    Calls one model, retrying timeouts, 5xx, 429 and network errors with
+    full-jitter exponential backoff for as long as the deadline allows.
+    With question_text the OCR text is sent instead of the image.
+
+    Output is capped by output_token_cap() for the expected mode. A
+    truncated answer is retried at once with four times the cap, up to
+    max_tokens_limit. Structured output is requested when structured_output
+    is set and the prompt does not ask for a chain of thought; a model that
+    rejects it is remembered and asked again without it.
+
+    Returns:
+        dict | None: The parsed result, or the last error dict. Returns
+                     {'error': 'circuit_open'} without calling if the model's
+                     breaker is open.
+    """
+    breaker = get_circuit_breaker(config)
+    connect_s = config.get('connect_timeout_s', 3.05)
+    read_s = config.get('read_timeout_s', 15.0)
+    max_retries = config.get('max_retries', 2)
+    backoff_s = config.get('retry_backoff_s', 0.5)
+    if stream is None:
+        stream = config.get('stream_responses', False)
+    if enable_reasoning is None:
+        enable_reasoning = config.get('enable_reasoning', False)
+    reasoning = enable_reasoning and is_model_supported(model)
+    max_tokens = output_token_cap(config, mode, reasoning)
+    limit = config.get('max_tokens_limit', 15000)
+    attempt = 0
+    while True:
+        if not breaker.allow(model):
+            logging.info("Circuit open for %s, failing fast", model)
+            return {'error': 'circuit_open'}
+        # A chain of thought has to come before the JSON, which a schema forbids
+        structured = config.get('structured_output', True) and not reasoning and model not in _unstructured_models
+        result = call_openrouter(image_data_url, model, config['api_key'], enable_reasoning,
+                                 deadline.timeout(connect_s, read_s), api_url=config.get('api_url', API_URL),
+                                 stream=stream, on_partial=on_partial, cancel=cancel, hint=hint,
+                                 question_text=question_text, max_tokens=max_tokens, structured=structured,
+                                 deadline=deadline)
+        error = result.get('error') if isinstance(result, dict) else 'server'
+        if error == 'unsupported':
+            logging.info("Structured output is not supported by %s, using the plain prompt", model)
+            _unstructured_models.add(model)
+            continue
+        if error == 'truncated' and max_tokens < limit and deadline.remaining() > connect_s + 1.0:
+            max_tokens = min(limit, max_tokens * 4)
+            logging.info("Retrying %s with max_tokens %d", model, max_tokens)
+            continue
+        if error not in RETRYABLE_ERRORS:
+            if error is None:
+                breaker.record_success(model)
+            return result
+        breaker.record_failure(model)
+        attempt += 1
+        delay = random.uniform(0, backoff_s * (2 ** (attempt - 1)))
+        # Only retry if a fresh attempt still has a realistic chance to finish
+        if attempt > max_retries or deadline.remaining() < delay + connect_s + 1.0:
+            logging.warning("Giving up on %s after %d attempt(s): %s", model, attempt, error)
+            return result
+        logging.info("Retrying %s in %.0f ms after %s", model, delay * 1000, error)
+        if cancel is not None:
+            if cancel.wait(delay):
+                return {'error': 'cancelled'}
+        else:
+            time.sleep(delay)
+
+
+def _model_attempt(image_data_url: str, model: str, config: dict, deadline: Deadline, on_partial, cancel: CancelToken,
+                   hint: str | None = None, mode: str | None = None) -> tuple:
+    """Runs one model with retries and validates the answer; returns (result, valid)."""
+    result = call_with_retries(image_data_url, model, config, deadline, on_partial, cancel, hint, mode=mode)
+    if not isinstance(result, dict) or 'error' in result:
+        return result, False
+    valid, msg = validate_result(result)
+    if not valid:
+        logging.warning("Hedged response from %s failed validation: %s", model, msg)
+    return result, valid
+
+
+def _submit(fn, *args):
+    """Submits to the shared executor, tracking the future until it finishes."""
+    future = _executor.submit(fn, *args)
+    with _executor_pending_lock:
+        _executor_pending.add(future)
+    future.add_done_callback(_forget_future)
+    return future
+
+
+def _forget_future(future):
+    with _executor_pending_lock:
+        _executor_pending.discard(future)
+
+
+def executor_busy() -> bool:
+    """True when every executor worker is taken, e.g. by cancelled hedges still waiting for headers."""
+    with _executor_pending_lock:
+        return len(_executor_pending) >= _EXECUTOR_WORKERS
+
+
+def hedged_call(image_data_url: str, models: list, config: dict, deadline: Deadline, hedge_delay_s: float,
+                on_partial=None, cancel: CancelToken | None = None, hint: str | None = None,
+                mode: str | None = None) -> dict | None:
+    """
+    Sends the request to models[0] and, each time hedge_delay_s passes (or
+    a request fails) without a valid answer, to the next model as well.
+    The first response that passes validate_result() wins and the rest are
+    cancelled.
+
+    A cancelled request still waiting for headers keeps its executor worker
+    until the server answers, so no hedge is added while the executor is
+    full; it would only queue behind them and delay the next press. The
+    one exception is when nothing is left running, since the call could
+    not make progress otherwise.
+
+    Returns:
+        dict | None: The winning result with 'model_used' set, or the last
+                     error result if no model produced a valid answer.
+    """
+    pending = list(models)
+    running = {}
+    partial_owner = []
+    partial_lock = threading.Lock()
+    last_launch = [0.0]
+    last_result = None
+
+    def forward_partial(model):
+        def emit(fields):
+            # Only one model may drive the early display, or answers from
+            # different models would flicker in the overlay
+            with partial_lock:
+                if not partial_owner:
+                    partial_owner.append(model)
+            if partial_owner[0] == model and on_partial is not None:
+                on_partial(fields)
+        return emit
+
+    def launch():
+        model = pending.pop(0)
+        token = CancelToken()
+        logging.debug("Hedged request to %s", model)
+        future = _submit(metrics.bind(_model_attempt), image_data_url, model, config, deadline, forward_partial(model), token, hint, mode)
+        running[future] = (model, token)
+        last_launch[0] = time.monotonic()
+
+    def cancel_running():
+        for _, token in running.values():
+            token.cancel()
+        running.clear()
+
+    launch()
+    while running:
+        remaining = deadline.remaining()
+        if remaining <= 0:
+            cancel_running()
+            return {'error': 'timeout'}
+        wait_s = min(hedge_delay_s, remaining) if pending else min(0.25, remaining)
+        if cancel is not None:
+            wait_s = min(wait_s, 0.05)
+        done, _ = wait(list(running), timeout=wait_s, return_when=FIRST_COMPLETED)
+        if cancel is not None and cancel.cancelled:
+            cancel_running()
+            return {'error': 'cancelled'}
+        if not done:
+            if pending and time.monotonic() - last_launch[0] >= hedge_delay_s:
+                if executor_busy():
+                    logging.debug("Executor full, holding back the hedge to %s", pending[0])
+                else:
+                    launch()
+            continue
+        for future in done:
+            model, _ = running.pop(future)
+            result, valid = future.result()
+            if valid:
+                logging.info("Hedged request won by %s with %d request(s) still in flight", model, len(running))
+                cancel_running()
+                result['model_used'] = model
+                return result
+            last_result = result
+            if isinstance(result, dict) and result.get('error') == 'auth':
+                # Every model shares the key, so there is nothing to hedge
+                cancel_running()
+                return result
+        # A failure launches the next model straight away instead of
+        # waiting out the rest of hedge_delay_s
+        if pending and (not running or not executor_busy()):
+            launch()
+    return last_result
+
+
+_cascade_stats = {'fast': 0, 'escalated_low_confidence': 0, 'escalated_invalid': 0, 'escalated_error': 0}
+_cascade_lock = threading.Lock()
+
+
+def cascade_stats() -> dict:
+    """Returns per-tier counts and the share of presses answered by the fast tier."""
+    with _cascade_lock:
+        stats = dict(_cascade_stats)
+    total = sum(stats.values())
+    stats['total'] = total
+    stats['fast_hit_rate'] = stats['fast'] / total if total else 0.0
+    return stats
+
+
+def _record_cascade(outcome: str) -> None:
+    with _cascade_lock:
+        _cascade_stats[outcome] += 1
+    stats = cascade_stats()
+    escalated = stats['total'] - stats['fast']
+    logging.info("Cascade %s: fast tier answered %d/%d (%.0f%%), escalated %d (low confidence %d, invalid %d, error %d)",
+                 outcome, stats['fast'], stats['total'], stats['fast_hit_rate'] * 100, escalated,
+                 stats['escalated_low_confidence'], stats['escalated_invalid'], stats['escalated_error'])
+
+
+def _question_hint(result: dict) -> str | None:
+    if not isinstance(result, dict) or not isinstance(result.get('question'), str):
+        return None
+    hint = {'question': result['question']}
+    if isinstance(result.get('choices'), list):
+        hint['choices'] = result['choices']
+    return json.dumps(hint)
+
+
+def _route_tier(image_data_url: str, config: dict, model: str, deadline: Deadline, on_partial, cancel: CancelToken | None,
+                hint: str | None = None, mode: str | None = None) -> dict | None:
+    breaker = get_circuit_breaker(config)
+    models = [model]
+    if config.get('hedge_enabled', False):
+        models += [m for m in config.get('hedge_models', []) if m and m not in models]
+    # Skip routes whose breaker is open so a dead model does not eat the
+    # budget; if every route is open, try them anyway and fail fast
+    healthy = [m for m in models if not breaker.is_open(m)]
+    if healthy and healthy[0] != model:
+        logging.info("Circuit open for %s, switching to %s", model, healthy[0])
+    models = healthy or models
+    if len(models) > 1:
+        return hedged_call(image_data_url, models, config, deadline, config.get('hedge_delay_s', 4.0), on_partial, cancel, hint, mode)
+    result = call_with_retries(image_data_url, models[0], config, deadline, on_partial, cancel, hint, mode=mode)
+    if isinstance(result, dict) and 'error' not in result:
+        result['model_used'] = models[0]
+    return result
+
+
+def route_text(question_text: str, config: dict, deadline: Deadline | float, on_partial=None,
+               cancel: CancelToken | None = None) -> dict | None:
+    """
+    Sends text read from the screenshot by OCR to ocr_text_model, a fast
+    text-only model, with retries inside the press deadline.
+
+    Returns:
+        dict | None: The parsed result with 'model_used' set, or an error dict.
+    """
+    if not isinstance(deadline, Deadline):
+        deadline = Deadline(deadline)
+    model = config.get('ocr_text_model') or config['model']
+    result = call_with_retries(None, model, config, deadline, on_partial, cancel, question_text=question_text)
+    if isinstance(result, dict) and 'error' not in result:
+        result['model_used'] = model
+    return result
+
+
+def route_request(image_data_url: str | None, config: dict, deadline: Deadline | float, on_partial=None,
+                  cancel: CancelToken | None = None, question_text: str | None = None) -> dict | None:
+    """
+    Sends the screenshot to the configured model, hedging across the backup
+    models when hedge_enabled is set. Every call shares the press deadline
+    and retries transient failures within it.
+
+    With cascade_enabled, cascade_fast_model is asked first and its answer is
+    kept if it validates with a confidence at or above confidence_threshold;
+    otherwise the question escalates to the configured model, optionally with
+    the fast model's reading of the question as a hint. The fast model gets a
+    single attempt within cascade_fast_timeout_s and at most half of the
+    remaining deadline, so a stalled fast model leaves the main model time to
+    answer.
+
+    With question_text set, the OCR text goes to route_text() instead and
+    no image is sent.
+
+    Returns:
+        dict | None: The parsed result with 'model_used' set, or an error dict.
+    """
+    if question_text is not None:
+        return route_text(question_text, config, deadline, on_partial, cancel)
+    if not isinstance(deadline, Deadline):
+        deadline = Deadline(deadline)
+    fast_model = config.get('cascade_fast_model', '')
+    if (not config.get('cascade_enabled', False) or not fast_model or fast_model == config['model']
+            or get_circuit_breaker(config).is_open(fast_model)):
+        return _route_tier(image_data_url, config, config['model'], deadline, on_partial, cancel)
+
+    # A fast answer may still be discarded, so it never drives the early display
+    fast_deadline = Deadline(min(config.get('cascade_fast_timeout_s', 5.0), deadline.remaining() / 2))
+    result = call_with_retries(image_data_url, fast_model, dict(config, max_retries=0), fast_deadline, cancel=cancel,
+                               stream=False, enable_reasoning=False)
+    if isinstance(result, dict) and result.get('error') in ('auth', 'cancelled'):
+        return result
+    hint = None
+    mode = None
+    if not isinstance(result, dict) or 'error' in result:
+        _record_cascade('escalated_error')
+    else:
+        # The fast model's reading of the mode sets the main model's token cap
+        mode = result.get('mode')
+        confident = is_confident(result, config)
+        valid, msg = validate_result(result)
+        if not valid:
+            _record_cascade('escalated_invalid')
+        elif confident:
+            _record_cascade('fast')
+            result['model_used'] = fast_model
+            result['cascade_tier'] = 'fast'
+            return result
+        else:
+            _record_cascade('escalated_low_confidence')
+        if config.get('cascade_send_question', True):
+            hint = _question_hint(result)
+    logging.info("Escalating from %s to %s", fast_model, config['model'])
+    result = _route_tier(image_data_url, config, config['model'], deadline, on_partial, cancel, hint, mode)
+    if isinstance(result, dict) and 'error' not in result:
+        result['cascade_tier'] = 'escalated'
+    return result
+
+
+def is_confident(result: dict, config: dict) -> bool:
+    """
+    Returns True if the answer reports a confidence at or above
+    confidence_threshold. Call it before validate_result(), which defaults a
+    missing or invalid confidence to 1.0; that default must not count as the
+    model being sure.
+    """
+    confidence = result.get('confidence')
+    return (isinstance(confidence, (int, float)) and 0.0 <= confidence <= 1.0
+            and confidence >= config.get('confidence_threshold', 0.7))
+
 
 def validate_result(obj: dict) -> tuple[bool, str]:
     if not isinstance(obj, dict):
@@ -83,14 +886,14 @@ def validate_result(obj: dict) -> tuple[bool, str]:
     required_keys = ['mode', 'question']
     for key in required_keys:
         if key not in obj:
-            logging.warning(f"Missing or invalid key: {key} in response")
+            logging.warning("Missing or invalid key: %s in response", key)
             return False, f"Missing key: {key}"
     
     if 'confidence' not in obj:
         logging.warning("Confidence field missing in response; defaulting to 1.0")
         obj['confidence'] = 1.0
     if not isinstance(obj['confidence'], (int, float)) or not (0.0 <= obj['confidence'] <= 1.0):
-        logging.warning(f"Missing or invalid key: confidence in response")
+        logging.warning("Missing or invalid key: confidence in response")
         obj['confidence'] = 1.0
     
     if obj['mode'] not in ['mcq', 'fitb', 'journal', 'tf']:
@@ -0,0 +1,156 @@
+import json
+import logging
+
+# Fields that carry the answer itself, per mode
+ANSWER_FIELDS = {
+    'mcq': ('answer_indices', 'answer_index'),
+    'tf': ('answer_index',),
+    'fitb': ('answer_text',),
+    'journal': ('answer_entries',),
+}
+
+
+def iter_sse_data(response, should_stop=None):
+    """
+    Yields the data payloads of a server-sent events response.
+
+    Comment lines (OpenRouter sends ': OPENROUTER PROCESSING' while the model
+    is queued) and other fields are skipped; iteration stops at '[DONE]'.
+
+    Args:
+        response (requests.Response): Response opened with stream=True.
+        should_stop (callable): Checked before every line, comments
+                                included; iteration ends when it returns True.
+
+    Yields:
+        str: The data of each event.
+    """
+    data_lines = []
+    # SSE is always UTF-8; requests would decode text/event-stream without a
+    # charset as ISO-8859-1, so lines are read as bytes and decoded here
+    for raw in response.iter_lines():
+        if should_stop is not None and should_stop():
+            return
+        if raw is None:
+            continue
+        line = raw.decode('utf-8', errors='replace')
+        if not line:
+            # A blank line terminates the event
+            if data_lines:
+                data = '\n'.join(data_lines)
+                data_lines = []
+                if data.strip() == '[DONE]':
+                    return
+                yield data
+            continue
+        if line.startswith(':'):
+            continue
+        if line.startswith('data:'):
+            data_lines.append(line[5:].lstrip(' '))
+    if data_lines:
+        data = '\n'.join(data_lines)
+        if data.strip() != '[DONE]':
+            yield data
+
+
+class PartialJSONParser:
+    """
+    Incrementally scans a streamed JSON object and decodes each top-level
+    field as soon as its value is complete.
+
+    Text before the first '{' (a code fence, a short preamble) is skipped.
+    Only top-level fields are reported; nested values are decoded whole once
+    they close.
+    """
+
+    def __init__(self):
+        self.text = ''
+        self.fields = {}
+        self.done = False
+        self._pos = 0
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._expect_key = True
+        self._key_start = None
+        self._key = None
+        self._value_start = None
+
+    def feed(self, chunk: str) -> list:
+        """
+        Appends streamed text and scans it.
+
+        Args:
+            chunk (str): The next piece of the model output.
+
+        Returns:
+            list: Names of the fields completed by this chunk.
+        """
+        self.text += chunk
+        completed = []
+        text = self.text
+        i = self._pos
+        while i < len(text) and not self.done:
+            ch = text[i]
+            if not self._started:
+                if ch == '{':
+                    self._started = True
+                    self._depth = 1
+                i += 1
+                continue
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._expect_key and self._key_start is not None:
+                        self._key = json.loads(text[self._key_start:i + 1])
+                        self._key_start = None
+                i += 1
+                continue
+            at_top = self._depth == 1
+            if ch == '"':
+                self._in_string = True
+                if at_top and self._expect_key:
+                    self._key_start = i
+                elif at_top and self._value_start is None:
+                    self._value_start = i
+            elif ch == ':' and at_top and self._expect_key:
+                self._expect_key = False
+                self._value_start = None
+            elif ch in '{[':
+                if at_top and not self._expect_key and self._value_start is None:
+                    self._value_start = i
+                self._depth += 1
+            elif ch in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    self._finish_value(i, completed)
+                    self.done = True
+            elif ch == ',' and at_top:
+                self._finish_value(i, completed)
+                self._expect_key = True
+            elif at_top and not self._expect_key and self._value_start is None and not ch.isspace():
+                # Number, true, false or null
+                self._value_start = i
+            i += 1
+        self._pos = i
+        return completed
+
+    def _finish_value(self, end: int, completed: list):
+        if self._key is not None and self._value_start is not None:
+            try:
+                self.fields[self._key] = json.loads(self.text[self._value_start:end])
+                completed.append(self._key)
+            except ValueError:
+                logging.debug("Could not decode streamed field %s", self._key)
+        self._key = None
+        self._value_start = None
+
+    def has_answer(self) -> bool:
+        """True once the mode and its answer field have both been decoded."""
+        fields = ANSWER_FIELDS.get(self.fields.get('mode'), ())
+        return any(field in self.fields for field in fields)
@@ -8,15 +8,25 @@ from PySide6.QtGui import QAction, QCloseEvent, QPixmap, QImage, QGuiApplication
 from PIL import Image
 from PIL.ImageQt import ImageQt
 import re
+import logging
 from config import load_config, save_config
 from hotkey import HotkeyInput, register, unregister
 from overlay import show_notification
-from capture import detect_monitor_under_mouse, capture_monitor, crop_percent, downscale_max_width
+from encoder import ENCODERS
+from ocr import OCR_BACKENDS
+from answer_cache import get_answer_cache
+from router import start_keepalive, stop_keepalive, API_URL
+from capture import (
+    detect_monitor_under_mouse, capture_cropped, crop_to_content, downscale_max_width, reduce_colors,
+    get_capture_session, RESAMPLE_FILTERS
+)
 
 class MainWindow(QMainWindow):
     hotkeyStartRequested = Signal(str)
     hotkeyStopRequested = Signal()
     answerReady = Signal(dict, float)
+    partialAnswerReady = Signal(dict)
+    metricsUpdated = Signal(dict)
     closeDialogRequested = Signal()
 
     def __init__(self):
@@ -25,6 +35,8 @@ class MainWindow(QMainWindow):
         self.config = load_config()
         self.pop_dialog_side = self.config.get("pop_dialog_side", "left")
         self.active_dialog = None
+        self.active_dialog_label = None
+        self.partial_answer_text = None
 
         # Central widget
         central_widget = QWidget()
@@ -117,6 +129,15 @@ class MainWindow(QMainWindow):
         bottom_crop_layout.addWidget(self.bottom_crop_spin)
         layout.addLayout(bottom_crop_layout)
 
+        # Auto Crop
+        auto_crop_layout = QHBoxLayout()
+        auto_crop_layout.addWidget(QLabel('Auto Crop Margins:'))
+        self.auto_crop_checkbox = QCheckBox()
+        self.auto_crop_checkbox.setChecked(self.config.get('auto_crop', False))
+        self.auto_crop_checkbox.stateChanged.connect(self.save_config)
+        auto_crop_layout.addWidget(self.auto_crop_checkbox)
+        layout.addLayout(auto_crop_layout)
+
         # Max Width
         max_width_layout = QHBoxLayout()
         max_width_layout.addWidget(QLabel('Max Width:'))
@@ -125,8 +146,182 @@ class MainWindow(QMainWindow):
         self.max_width_spin.setValue(self.config.get('max_width', 1024))
         self.max_width_spin.valueChanged.connect(self.save_config)
         max_width_layout.addWidget(self.max_width_spin)
+        self.downscale_filter_combo = QComboBox()
+        self.downscale_filter_combo.addItems(list(RESAMPLE_FILTERS))
+        self.downscale_filter_combo.setCurrentText(self.config.get('downscale_filter', 'lanczos'))
+        self.downscale_filter_combo.currentTextChanged.connect(self.save_config)
+        max_width_layout.addWidget(self.downscale_filter_combo)
         layout.addLayout(max_width_layout)
 
+        # Encoder
+        encoder_layout = QHBoxLayout()
+        encoder_layout.addWidget(QLabel('Encoder:'))
+        self.encoder_combo = QComboBox()
+        self.encoder_combo.addItems(list(ENCODERS))
+        self.encoder_combo.setCurrentText(self.config.get('encoder', 'png'))
+        self.encoder_combo.currentTextChanged.connect(self.save_config)
+        encoder_layout.addWidget(self.encoder_combo)
+        layout.addLayout(encoder_layout)
+
+        # Encoder Quality
+        encoder_quality_layout = QHBoxLayout()
+        encoder_quality_layout.addWidget(QLabel('Encoder Quality:'))
+        self.encoder_quality_spin = QSpinBox()
+        self.encoder_quality_spin.setRange(1, 100)
+        self.encoder_quality_spin.setValue(self.config.get('encoder_quality', 85))
+        self.encoder_quality_spin.valueChanged.connect(self.save_config)
+        encoder_quality_layout.addWidget(self.encoder_quality_spin)
+        layout.addLayout(encoder_quality_layout)
+
+        # Encoder Max KB
+        encoder_max_kb_layout = QHBoxLayout()
+        encoder_max_kb_layout.addWidget(QLabel('Max Payload KB (0 = off):'))
+        self.encoder_max_kb_spin = QSpinBox()
+        self.encoder_max_kb_spin.setRange(0, 10240)
+        self.encoder_max_kb_spin.setValue(self.config.get('encoder_max_kb', 0))
+        self.encoder_max_kb_spin.valueChanged.connect(self.save_config)
+        encoder_max_kb_layout.addWidget(self.encoder_max_kb_spin)
+        layout.addLayout(encoder_max_kb_layout)
+
+        # Preprocess
+        preprocess_layout = QHBoxLayout()
+        preprocess_layout.addWidget(QLabel('Preprocess:'))
+        self.preprocess_combo = QComboBox()
+        self.preprocess_combo.addItems(['none', 'grayscale', 'palette'])
+        self.preprocess_combo.setCurrentText(self.config.get('preprocess', 'none'))
+        self.preprocess_combo.currentTextChanged.connect(self.save_config)
+        preprocess_layout.addWidget(self.preprocess_combo)
+        self.palette_colors_spin = QSpinBox()
+        self.palette_colors_spin.setRange(2, 256)
+        self.palette_colors_spin.setPrefix('Colors: ')
+        self.palette_colors_spin.setValue(self.config.get('palette_colors', 16))
+        self.palette_colors_spin.valueChanged.connect(self.save_config)
+        preprocess_layout.addWidget(self.palette_colors_spin)
+        self.autocontrast_checkbox = QCheckBox('Autocontrast')
+        self.autocontrast_checkbox.setChecked(self.config.get('autocontrast', False))
+        self.autocontrast_checkbox.stateChanged.connect(self.save_config)
+        preprocess_layout.addWidget(self.autocontrast_checkbox)
+        layout.addLayout(preprocess_layout)
+
+        # Press Mode
+        press_mode_layout = QHBoxLayout()
+        press_mode_layout.addWidget(QLabel('Repeated Presses:'))
+        self.press_mode_combo = QComboBox()
+        self.press_mode_combo.addItem('Latest press wins', 'latest')
+        self.press_mode_combo.addItem('Queue presses', 'queue')
+        self.press_mode_combo.setCurrentIndex(max(0, self.press_mode_combo.findData(self.config.get('press_mode', 'latest'))))
+        self.press_mode_combo.currentIndexChanged.connect(self.save_config)
+        press_mode_layout.addWidget(self.press_mode_combo)
+        layout.addLayout(press_mode_layout)
+
+        # Watch Mode (applied when the hotkey is started)
+        watch_layout = QHBoxLayout()
+        watch_layout.addWidget(QLabel('Watch Mode:'))
+        self.watch_checkbox = QCheckBox()
+        self.watch_checkbox.setToolTip('Answer automatically when the question area changes and settles')
+        self.watch_checkbox.setChecked(self.config.get('watch_enabled', False))
+        self.watch_checkbox.stateChanged.connect(self.save_config)
+        watch_layout.addWidget(self.watch_checkbox)
+        layout.addLayout(watch_layout)
+
+        # Pre-capture (applied when the hotkey is started)
+        precapture_layout = QHBoxLayout()
+        precapture_layout.addWidget(QLabel('Pre-capture:'))
+        self.precapture_combo = QComboBox()
+        self.precapture_combo.addItem('Off', 'off')
+        self.precapture_combo.addItem('On key-down', 'keydown')
+        self.precapture_combo.addItem('Rolling frames', 'ring')
+        self.precapture_combo.setCurrentIndex(max(0, self.precapture_combo.findData(self.config.get('precapture_mode', 'off'))))
+        self.precapture_combo.currentIndexChanged.connect(self.save_config)
+        precapture_layout.addWidget(self.precapture_combo)
+        layout.addLayout(precapture_layout)
+
+        # Request Deadline
+        deadline_layout = QHBoxLayout()
+        deadline_layout.addWidget(QLabel('Request Deadline:'))
+        self.deadline_spin = QDoubleSpinBox()
+        self.deadline_spin.setRange(2.0, 120.0)
+        self.deadline_spin.setSingleStep(1.0)
+        self.deadline_spin.setSuffix(' s')
+        self.deadline_spin.setValue(self.config.get('request_deadline_s', 20.0))
+        self.deadline_spin.valueChanged.connect(self.save_config)
+        deadline_layout.addWidget(self.deadline_spin)
+        layout.addLayout(deadline_layout)
+
+        # Model Cascade
+        cascade_layout = QHBoxLayout()
+        cascade_layout.addWidget(QLabel('Try Fast Model First:'))
+        self.cascade_checkbox = QCheckBox()
+        self.cascade_checkbox.setChecked(self.config.get('cascade_enabled', False))
+        self.cascade_checkbox.stateChanged.connect(self.save_config)
+        cascade_layout.addWidget(self.cascade_checkbox)
+        self.cascade_model_edit = QLineEdit()
+        self.cascade_model_edit.setText(self.config.get('cascade_fast_model', 'meta-llama/llama-3.2-11b-vision-instruct'))
+        self.cascade_model_edit.editingFinished.connect(self.save_config)
+        cascade_layout.addWidget(self.cascade_model_edit)
+        layout.addLayout(cascade_layout)
+
+        # Local OCR text-only route
+        ocr_layout = QHBoxLayout()
+        ocr_layout.addWidget(QLabel('Text-Only via OCR:'))
+        self.ocr_checkbox = QCheckBox()
+        ocr_backend = OCR_BACKENDS.get(self.config.get('ocr_backend', 'tesseract'))
+        if ocr_backend is not None and ocr_backend.available():
+            self.ocr_checkbox.setToolTip('Read the question locally and send only its text when OCR is confident')
+        else:
+            self.ocr_checkbox.setEnabled(False)
+            self.ocr_checkbox.setToolTip('Install pytesseract and Tesseract to enable')
+        self.ocr_checkbox.setChecked(self.config.get('ocr_enabled', False))
+        self.ocr_checkbox.stateChanged.connect(self.save_config)
+        ocr_layout.addWidget(self.ocr_checkbox)
+        self.ocr_model_edit = QLineEdit()
+        self.ocr_model_edit.setText(self.config.get('ocr_text_model', 'meta-llama/llama-3.1-8b-instruct'))
+        self.ocr_model_edit.editingFinished.connect(self.save_config)
+        ocr_layout.addWidget(self.ocr_model_edit)
+        layout.addLayout(ocr_layout)
+
+        # Hedged Requests
+        hedge_layout = QHBoxLayout()
+        hedge_layout.addWidget(QLabel('Hedge Models:'))
+        self.hedge_checkbox = QCheckBox()
+        self.hedge_checkbox.setChecked(self.config.get('hedge_enabled', False))
+        self.hedge_checkbox.stateChanged.connect(self.save_config)
+        hedge_layout.addWidget(self.hedge_checkbox)
+        self.hedge_models_edit = QLineEdit()
+        self.hedge_models_edit.setPlaceholderText('backup/model-a, backup/model-b')
+        self.hedge_models_edit.setText(', '.join(self.config.get('hedge_models', [])))
+        self.hedge_models_edit.editingFinished.connect(self.save_config)
+        hedge_layout.addWidget(self.hedge_models_edit)
+        self.hedge_delay_spin = QDoubleSpinBox()
+        self.hedge_delay_spin.setRange(0.0, 30.0)
+        self.hedge_delay_spin.setSingleStep(0.5)
+        self.hedge_delay_spin.setSuffix(' s')
+        self.hedge_delay_spin.setValue(self.config.get('hedge_delay_s', 4.0))
+        self.hedge_delay_spin.valueChanged.connect(self.save_config)
+        hedge_layout.addWidget(self.hedge_delay_spin)
+        layout.addLayout(hedge_layout)
+
+        # Stream Responses
+        stream_layout = QHBoxLayout()
+        stream_layout.addWidget(QLabel('Stream Responses:'))
+        self.stream_checkbox = QCheckBox()
+        self.stream_checkbox.setChecked(self.config.get('stream_responses', False))
+        self.stream_checkbox.stateChanged.connect(self.save_config)
+        stream_layout.addWidget(self.stream_checkbox)
+        layout.addLayout(stream_layout)
+
+        # Answer Cache
+        cache_layout = QHBoxLayout()
+        cache_layout.addWidget(QLabel('Answer Cache:'))
+        self.cache_checkbox = QCheckBox()
+        self.cache_checkbox.setChecked(self.config.get('cache_enabled', False))
+        self.cache_checkbox.stateChanged.connect(self.save_config)
+        cache_layout.addWidget(self.cache_checkbox)
+        self.clear_cache_button = QPushButton('Clear Cache')
+        self.clear_cache_button.clicked.connect(self.clear_answer_cache)
+        cache_layout.addWidget(self.clear_cache_button)
+        layout.addLayout(cache_layout)
+
         # Bypass Confidence
         bypass_layout = QHBoxLayout()
         bypass_layout.addWidget(QLabel('Bypass Confidence:'))
@@ -191,6 +386,13 @@ class MainWindow(QMainWindow):
         self.test_screenshot_button.clicked.connect(self.show_test_screenshot)
         layout.addWidget(self.test_screenshot_button)
 
+        # Live Metrics
+        self.metrics_label = QLabel('No presses yet')
+        self.metrics_label.setWordWrap(True)
+        self.metrics_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        layout.addWidget(QLabel('Metrics:'))
+        layout.addWidget(self.metrics_label)
+
         # Start/Stop Button
         self.start_stop_button = QPushButton('Start')
         self.start_stop_button.clicked.connect(self.toggle_hotkey)
@@ -198,10 +400,11 @@ class MainWindow(QMainWindow):
 
         # Status Bar
         self.status_bar = self.statusBar()
+        # Permanent widgets stay visible while showMessage() text is up
         self.inference_label = QLabel('Last inference: 0 ms')
-        self.status_bar.addWidget(self.inference_label)
+        self.status_bar.addPermanentWidget(self.inference_label)
         self.confidence_label = QLabel('Confidence: 0.00')
-        self.status_bar.addWidget(self.confidence_label)
+        self.status_bar.addPermanentWidget(self.confidence_label)
 
         # System Tray Icon
         self.tray_icon = QSystemTrayIcon(self)
@@ -214,12 +417,22 @@ class MainWindow(QMainWindow):
         quit_action.triggered.connect(QApplication.quit)
         tray_menu.addAction(quit_action)
         self.tray_icon.setContextMenu(tray_menu)
+        self.tray_icon.setToolTip('QuizPeek')
         self.tray_icon.show()
 
         # Connect answer ready signal
         self.answerReady.connect(self.show_answer_dialog)
+        self.partialAnswerReady.connect(self.show_partial_answer)
+        self.metricsUpdated.connect(self.update_metrics)
         self.closeDialogRequested.connect(self.close_active_dialog)
 
+        # Drop the cached monitor table whenever the screen layout changes
+        app = QGuiApplication.instance()
+        app.screenAdded.connect(self.on_screen_added)
+        app.screenRemoved.connect(self.on_screens_changed)
+        for screen in app.screens():
+            screen.geometryChanged.connect(self.on_screens_changed)
+
     def toggle_hotkey(self):
         if self.start_stop_button.text() == 'Start':
             combo = self.hotkey_input.text()
@@ -227,14 +440,24 @@ class MainWindow(QMainWindow):
             # Register close hotkey
             close_combo = self.close_hotkey_input.text()
             register(close_combo, lambda: self.closeDialogRequested.emit())
+            # Open the API connection now so the first press skips the TLS handshake
+            start_keepalive(self.config.get('api_url', API_URL), self.config.get('keepalive_interval_s', 45))
             self.start_stop_button.setText('Stop')
         else:
             self.hotkeyStopRequested.emit()
             # Unregister close hotkey
             close_combo = self.close_hotkey_input.text()
             unregister(close_combo)
+            stop_keepalive()
             self.start_stop_button.setText('Start')
 
+    def on_screen_added(self, screen):
+        screen.geometryChanged.connect(self.on_screens_changed)
+        self.on_screens_changed()
+
+    def on_screens_changed(self, *args):
+        get_capture_session().invalidate()
+
     def close_active_dialog(self):
         if self.active_dialog:
             self.active_dialog.close()
@@ -258,12 +481,16 @@ class MainWindow(QMainWindow):
 
     def show_test_screenshot(self):
         monitor = detect_monitor_under_mouse()
-        img = capture_monitor(monitor)
         top_pct = self.config.get('top_crop_pct', 8)
         bot_pct = self.config.get('bottom_crop_pct', 6)
-        img = crop_percent(img, top_pct, bot_pct)
+        img = capture_cropped(monitor, top_pct, bot_pct)
+        if self.config.get('auto_crop', False):
+            img = crop_to_content(img, self.config.get('auto_crop_margin', 16))
         max_w = self.config.get('max_width', 1024)
-        img = downscale_max_width(img, max_w)
+        img = downscale_max_width(img, max_w, self.config.get('downscale_filter', 'lanczos'),
+                                  self.config.get('downscale_reducing_gap', 2.0))
+        img = reduce_colors(img, self.config.get('preprocess', 'none'),
+                            self.config.get('palette_colors', 16), self.config.get('autocontrast', False))
         # Convert to QPixmap
         img_qt = ImageQt(img)
         pixmap = QPixmap.fromImage(img_qt)
@@ -280,84 +507,130 @@ class MainWindow(QMainWindow):
         dialog.raise_()
         dialog.activateWindow()
 
+    def answer_base_text(self, result):
+        if result['mode'] == 'mcq':
+            if 'answer_indices' in result and result['answer_indices']:
+                answers = ', '.join(chr(65 + i) for i in sorted(result['answer_indices']))
+                base_text = answers
+            elif 'answer_index' in result:
+                base_text = chr(65 + result['answer_index'])
+            else:
+                base_text = "Unknown"
+        elif result['mode'] == 'journal':
+            if 'answer_entries' in result and result['answer_entries']:
+                first_entry = result['answer_entries'][0][:15]
+                remaining_count = len(result['answer_entries']) - 1
+                if remaining_count > 0:
+                    base_text = f"{first_entry}(+{remaining_count})"
+                else:
+                    base_text = first_entry
+            else:
+                base_text = "No entries"
+        elif result['mode'] == 'tf':
+            if 'answer_index' in result:
+                answer = 'T' if result['answer_index'] == 0 else 'F'
+                base_text = answer
+            else:
+                base_text = "Unknown"
+        else:
+            base_text = result.get('answer_text', result.get('raw_answer_text', '')[:20])
+        return base_text
+
+    def answer_dialog_text(self, result, base_text, confidence_text):
+        if result['mode'] == 'journal' and 'answer_entries' in result and result['answer_entries']:
+            base_text = "\n".join(result['answer_entries'])
+        if confidence_text:
+            return f"{base_text}\n{confidence_text}"
+        return base_text
+
+    def open_answer_dialog(self, text):
+        dialog = QDialog()
+        dialog.setWindowTitle("Answer")
+        dialog.setWindowFlags(Qt.Window | Qt.WindowStaysOnTopHint)
+        dialog.setWindowOpacity(self.config.get('popup_opacity', 0.9))
+        layout = QVBoxLayout(dialog)
+        label = QLabel(text)
+        label.setWordWrap(True)
+        layout.addWidget(label)
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(dialog.close)
+        layout.addWidget(close_button)
+        self.active_dialog = dialog
+        self.active_dialog_label = label
+        dialog.finished.connect(lambda: setattr(self, 'active_dialog', None))
+        dialog.adjustSize()
+        screen = QGuiApplication.primaryScreen()
+        screen_geom = screen.availableGeometry()
+        if self.pop_dialog_side == "left":
+            x = 0
+        else:
+            x = screen_geom.width() - dialog.width()
+        y = (screen_geom.height() - dialog.height()) // 2
+        dialog.setGeometry(x, y, dialog.width(), dialog.height())
+        dialog.show()
+        dialog.raise_()
+
+    def show_partial_answer(self, result):
+        # Streaming delivered the answer before confidence; show it now and
+        # let show_answer_dialog() confirm or retract it when the rest lands
+        base_text = self.answer_base_text(result)
+        show_confidence = self.config.get('show_confidence_rating', False)
+        if self.config.get('show_notifications', False):
+            if self.partial_answer_text is None:
+                show_notification(base_text, "amber")
+        elif self.partial_answer_text is not None and self.active_dialog is not None:
+            self.active_dialog_label.setText(self.answer_dialog_text(result, base_text, '…' if show_confidence else ''))
+        else:
+            self.open_answer_dialog(self.answer_dialog_text(result, base_text, '…' if show_confidence else ''))
+        self.partial_answer_text = base_text
+        self.status_bar.showMessage(f'Answer: {base_text} (streaming)')
+
+    def retract_partial_answer(self):
+        # The press failed after its answer was streamed; take the early answer down
+        partial_text, self.partial_answer_text = self.partial_answer_text, None
+        if partial_text is not None and self.active_dialog is not None:
+            self.active_dialog.close()
+
     def show_answer_dialog(self, result, inference_time):
-        print("show_answer_dialog called")
         confidence = result['confidence']
         threshold = self.config['confidence_threshold']
         bypass = self.config.get('bypass_confidence', False)
         show_notifications = self.config.get('show_notifications', False)
         show_confidence = self.config.get('show_confidence_rating', False)
-        print(f"Confidence: {confidence}, Threshold: {threshold}, Bypass: {bypass}, Show Notifications: {show_notifications}")
+        partial_text, self.partial_answer_text = self.partial_answer_text, None
+        logging.debug("Confidence: %s, Threshold: %s, Bypass: %s, Show Notifications: %s", confidence, threshold, bypass, show_notifications)
         if bypass or confidence >= threshold:
-            if result['mode'] == 'mcq':
-                if 'answer_indices' in result and result['answer_indices']:
-                    answers = ', '.join(chr(65 + i) for i in sorted(result['answer_indices']))
-                    base_text = answers
-                elif 'answer_index' in result:
-                    base_text = chr(65 + result['answer_index'])
-                else:
-                    base_text = "Unknown"
-            elif result['mode'] == 'journal':
-                if 'answer_entries' in result and result['answer_entries']:
-                    first_entry = result['answer_entries'][0][:15]
-                    remaining_count = len(result['answer_entries']) - 1
-                    if remaining_count > 0:
-                        base_text = f"{first_entry}(+{remaining_count})"
-                    else:
-                        base_text = first_entry
-                else:
-                    base_text = "No entries"
-            elif result['mode'] == 'tf':
-                if 'answer_index' in result:
-                    answer = 'T' if result['answer_index'] == 0 else 'F'
-                    base_text = answer
-                else:
-                    base_text = "Unknown"
-            else:
-                base_text = result.get('answer_text', result['raw_answer_text'][:20])
+            base_text = self.answer_base_text(result)
             if show_confidence:
                 text = f"{base_text}\n{confidence:.2f}"
             else:
                 text = base_text
             color = "green" if confidence >= threshold else "amber"
             if show_notifications:
-                print("Showing notification")
-                show_notification(text, color)
+                if partial_text != base_text or show_confidence:
+                    show_notification(text, color)
             else:
-                print("Showing dialog")
-                if result['mode'] == 'journal' and 'answer_entries' in result and result['answer_entries']:
-                    full_base = "\n".join(result['answer_entries'])
-                    if show_confidence:
-                        text = f"{full_base}\n{confidence:.2f}"
-                    else:
-                        text = full_base
-                dialog = QDialog()
-                dialog.setWindowTitle("Answer")
-                dialog.setWindowFlags(Qt.Window | Qt.WindowStaysOnTopHint)
-                dialog.setWindowOpacity(self.config.get('popup_opacity', 0.9))
-                layout = QVBoxLayout(dialog)
-                label = QLabel(text)
-                label.setWordWrap(True)
-                layout.addWidget(label)
-                close_button = QPushButton("Close")
-                close_button.clicked.connect(dialog.close)
-                layout.addWidget(close_button)
-                self.active_dialog = dialog
-                dialog.finished.connect(lambda: setattr(self, 'active_dialog', None))
-                dialog.adjustSize()
-                screen = QGuiApplication.primaryScreen()
-                screen_geom = screen.availableGeometry()
-                if self.pop_dialog_side == "left":
-                    x = 0
+                text = self.answer_dialog_text(result, base_text, f"{confidence:.2f}" if show_confidence else '')
+                if partial_text is not None and self.active_dialog is not None:
+                    self.active_dialog_label.setText(text)
+                    self.active_dialog.adjustSize()
                 else:
-                    x = screen_geom.width() - dialog.width()
-                y = (screen_geom.height() - dialog.height()) // 2
-                dialog.setGeometry(x, y, dialog.width(), dialog.height())
-                dialog.show()
-                dialog.raise_()
+                    self.open_answer_dialog(text)
         else:
-            print("Not showing answer")
-        self.status_bar.showMessage(f'Inference: {inference_time:.0f} ms, Confidence: {confidence:.2f}')
+            logging.debug("Answer below confidence threshold, not shown")
+            if partial_text is not None and self.active_dialog is not None:
+                # The streamed answer turned out to be below the threshold
+                self.active_dialog.close()
+        cached = ' (cached)' if result.get('cached') else ''
+        show_model = self.config.get('hedge_enabled', False) or self.config.get('cascade_enabled', False)
+        model_used = f", Model: {result['model_used']}" if result.get('model_used') and show_model else ''
+        self.status_bar.showMessage(f'Inference: {inference_time:.0f} ms{cached}, Confidence: {confidence:.2f}{model_used}')
+        self.update_inference_time(inference_time)
+        self.update_confidence(confidence)
+
+    def clear_answer_cache(self):
+        get_answer_cache(self.config).clear()
+        self.status_bar.showMessage('Answer cache cleared')
 
     def save_config(self):
         self.config['model'] = self.model_combo.currentText()
@@ -366,9 +639,30 @@ class MainWindow(QMainWindow):
         self.config['popup_opacity'] = self.opacity_spin.value()
         self.config['top_crop_pct'] = self.top_crop_spin.value()
         self.config['bottom_crop_pct'] = self.bottom_crop_spin.value()
+        self.config['auto_crop'] = self.auto_crop_checkbox.isChecked()
         self.config['max_width'] = self.max_width_spin.value()
+        self.config['downscale_filter'] = self.downscale_filter_combo.currentText()
+        self.config['encoder'] = self.encoder_combo.currentText()
+        self.config['encoder_quality'] = self.encoder_quality_spin.value()
+        self.config['encoder_max_kb'] = self.encoder_max_kb_spin.value()
+        self.config['preprocess'] = self.preprocess_combo.currentText()
+        self.config['palette_colors'] = self.palette_colors_spin.value()
+        self.config['autocontrast'] = self.autocontrast_checkbox.isChecked()
         self.config['save_key'] = self.save_key_checkbox.isChecked()
         self.config['bypass_confidence'] = self.bypass_checkbox.isChecked()
+        self.config['cache_enabled'] = self.cache_checkbox.isChecked()
+        self.config['stream_responses'] = self.stream_checkbox.isChecked()
+        self.config['press_mode'] = self.press_mode_combo.currentData()
+        self.config['precapture_mode'] = self.precapture_combo.currentData()
+        self.config['watch_enabled'] = self.watch_checkbox.isChecked()
+        self.config['request_deadline_s'] = self.deadline_spin.value()
+        self.config['cascade_enabled'] = self.cascade_checkbox.isChecked()
+        self.config['cascade_fast_model'] = self.cascade_model_edit.text().strip()
+        self.config['ocr_enabled'] = self.ocr_checkbox.isChecked()
+        self.config['ocr_text_model'] = self.ocr_model_edit.text().strip()
+        self.config['hedge_enabled'] = self.hedge_checkbox.isChecked()
+        self.config['hedge_models'] = [m.strip() for m in self.hedge_models_edit.text().split(',') if m.strip()]
+        self.config['hedge_delay_s'] = self.hedge_delay_spin.value()
         self.config['show_notifications'] = self.notifications_checkbox.isChecked()
         self.config['show_raw_answer'] = self.show_raw_checkbox.isChecked()
         self.config['show_confidence_rating'] = self.show_confidence_checkbox.isChecked()
@@ -406,15 +700,54 @@ class MainWindow(QMainWindow):
         save_config(self.config)
 
     def update_inference_time(self, ms):
-        self.inference_label.setText(f'Last inference: {ms} ms')
+        self.inference_label.setText(f'Last inference: {ms:.0f} ms')
 
     def update_confidence(self, conf):
         self.confidence_label.setText(f'Confidence: {conf:.2f}')
 
+    def update_metrics(self, summary):
+        # summary comes from LatencyStats.summary() on the worker thread
+        total = summary['total']
+        if summary['last'] is None:
+            return
+        if total['count']:
+            latency = f"p50 {total['p50']:.0f} ms, p95 {total['p95']:.0f} ms over {total['count']} answered presses"
+        else:
+            latency = "no answered presses yet"
+        lines = [f"Latency: {latency}"]
+        last = summary['last']
+        if last is not None:
+            stages = ', '.join(f"{name} {ms:.0f}" for name, ms in last['spans_ms'].items() if name != 'total')
+            model = f" via {last['model_used']}" if last.get('model_used') else ''
+            lines.append(f"Last press ({last.get('outcome', '?')}{model}): {stages} ms")
+        figures = []
+        if summary['cached']:
+            figures.append(f"{summary['cached']} cached")
+        if summary['cancelled']:
+            figures.append(f"{summary['cancelled']} cancelled")
+        if summary['cache_hit_rate'] is not None:
+            figures.append(f"Cache hits {summary['cache_hit_rate']:.0%}")
+        if summary.get('text_rate') is not None:
+            figures.append(f"Text-only {summary['text_rate']:.0%}")
+        if summary['payload_bytes'] is not None:
+            figures.append(f"Payload {summary['payload_bytes'] / 1024:.0f} KB")
+        figures.append(f"{summary['presses_per_min']} presses/min")
+        lines.append(', '.join(figures))
+        precapture = summary.get('precapture')
+        if precapture is not None:
+            lines.append(f"Pre-capture: {precapture['used']}/{precapture['frames']} frames used, "
+                         f"{precapture['cpu_ms_per_frame']:.0f} ms CPU per frame, {precapture['held_bytes'] / 1024:.0f} KB held"
+                         + (f", {precapture['throttled']} key-downs rate-limited" if precapture['throttled'] else ''))
+        watch = summary.get('watch')
+        if watch is not None:
+            lines.append(f"Watch: {watch['triggers']} presses from {watch['samples']} samples, "
+                         f"{watch['cpu_ms_per_sample']:.1f} ms CPU per sample")
+        self.metrics_label.setText('\n'.join(lines))
+        self.tray_icon.setToolTip(f"QuizPeek\n{latency}\n{summary['presses_per_min']} presses/min")
+
     def closeEvent(self, event: QCloseEvent):
-        # Wait for any running workers
-        if hasattr(self, 'current_worker') and self.current_worker.isRunning():
-            self.current_worker.wait()
+        # The pipeline worker lives until the app quits; it is stopped from
+        # QApplication.aboutToQuit, so there is nothing to wait for here
         save_config(self.config)
         super().closeEvent(event)
 
@@ -0,0 +1,120 @@
+from PIL import Image, ImageChops, ImageStat
+import logging
+import threading
+import time
+from capture import detect_monitor_under_mouse, capture_cropped, get_capture_session
+
+
+def frame_signature(img: Image.Image, width: int = 64) -> Image.Image:
+    """
+    Shrinks a frame to a small grayscale thumbnail for change detection.
+
+    Args:
+        img (PIL.Image.Image): The captured band.
+        width (int): Thumbnail width; the height keeps the aspect ratio.
+
+    Returns:
+        PIL.Image.Image: An 'L' mode thumbnail.
+    """
+    height = max(1, round(img.height * width / max(1, img.width)))
+    return img.resize((width, height), Image.BOX).convert('L')
+
+
+def frame_difference(a: Image.Image | None, b: Image.Image | None) -> float:
+    """
+    Mean absolute difference between two signatures, from 0 (identical) to
+    255. Signatures of different sizes (another monitor) count as 255.
+    """
+    if a is None or b is None or a.size != b.size:
+        return 255.0
+    return ImageStat.Stat(ImageChops.difference(a, b)).mean[0]
+
+
+class Watcher:
+    """
+    Watches the question band of the monitor under the mouse and calls
+    on_change once it has changed from the last answered frame and then
+    held still, so a new question is answered without a hotkey press.
+
+    Sampling grabs the band through the shared capture session, shrinks it
+    to a signature and compares signatures, all in Pillow's C code. The
+    interval is stretched as needed to keep the loop's CPU time under
+    cpu_budget of one core.
+    """
+
+    def __init__(self, on_change):
+        self.on_change = on_change
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._stats = {'samples': 0, 'triggers': 0, 'cpu_ms': 0.0}
+
+    def start(self, config: dict) -> None:
+        """Starts watching with a snapshot of the config."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        # Each run gets its own stop event, so a loop still finishing a
+        # sample after stop() cannot be revived by a quick restart
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, args=(dict(config), self._stop), name='watch', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread = None
+
+    def sample(self, config: dict) -> Image.Image:
+        """Grabs the configured band under the mouse and returns its signature."""
+        mon = detect_monitor_under_mouse()
+        img = capture_cropped(mon, config['top_crop_pct'], config['bottom_crop_pct'])
+        return frame_signature(img, config.get('watch_thumb_width', 64))
+
+    def _loop(self, config: dict, stop: threading.Event):
+        interval_s = config.get('watch_interval_s', 0.5)
+        cpu_budget = config.get('watch_cpu_budget', 0.03)
+        change_threshold = config.get('watch_change_threshold', 8.0)
+        settle_threshold = config.get('watch_settle_threshold', 2.0)
+        settle_samples = config.get('watch_settle_samples', 2)
+        answered = None
+        previous = None
+        still = 0
+        logging.info("Watch mode started")
+        while not stop.is_set():
+            cpu_start = time.thread_time()
+            try:
+                current = self.sample(config)
+            except Exception as e:
+                logging.warning("Watch sample failed: %s", e)
+                current = None
+            if current is not None:
+                if answered is None:
+                    # Whatever is on screen when watching starts is the baseline
+                    answered = current
+                elif frame_difference(current, answered) > change_threshold:
+                    # Changed since the last answer; wait for it to stop moving
+                    # (scrolling, page transitions) before answering
+                    still = still + 1 if frame_difference(current, previous) <= settle_threshold else 0
+                    if still >= settle_samples:
+                        logging.info("Question area changed; submitting a press")
+                        answered = current
+                        still = 0
+                        with self._lock:
+                            self._stats['triggers'] += 1
+                        self.on_change()
+                else:
+                    still = 0
+                previous = current
+            cpu_s = time.thread_time() - cpu_start
+            with self._lock:
+                self._stats['samples'] += 1
+                self._stats['cpu_ms'] += cpu_s * 1000
+            stop.wait(max(interval_s, cpu_s / cpu_budget if cpu_budget > 0 else 0.0))
+        get_capture_session().release()
+        logging.info("Watch mode stopped")
+
+    def stats(self) -> dict:
+        """Returns samples taken, presses triggered and mean CPU ms per sample."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['cpu_ms_per_sample'] = stats['cpu_ms'] / stats['samples'] if stats['samples'] else 0.0
+        return stats